@@ -7,6 +7,8 @@ from ultralytics import YOLO
 from pathlib import Path
 import json
 import shutil
+import hashlib
+from concurrent.futures import ThreadPoolExecutor
 from tqdm import tqdm
 import matplotlib.pyplot as plt
 import seaborn as sns
@@ -113,7 +115,9 @@ class ElectricalComponentTrainer:
         self.config.setdefault('batch_size', 16)
         self.config.setdefault('img_size', 640)
         self.config.setdefault('workers', 8)
-        
+        self.config.setdefault('pre_resize', True)
+        self.config.setdefault('compile_model', True)
+
         # Force GPU usage if available, with detailed device selection
         if torch.cuda.is_available():
             self.config['device'] = 'cuda:0'  # Explicitly use first GPU
@@ -148,7 +152,72 @@ class ElectricalComponentTrainer:
         # Create directories
         for dir_path in [self.train_dir, self.val_dir, self.train_labels_dir, self.val_labels_dir]:
             dir_path.mkdir(parents=True, exist_ok=True)
-            
+
+    def prepare_cached_dataset(self, imgsz):
+        """Pre-resize the dataset to the training image size once, so the dataloader
+        does not decode and resize full-resolution images every epoch"""
+        cache_dir = self.base_dir.parent / f"{self.base_dir.name}_{imgsz}"
+        print(f"🗜️  Preparing resized dataset cache ({imgsz}px): {cache_dir}")
+
+        image_extensions = ('.png', '.jpg', '.jpeg', '.bmp', '.tiff')
+        resized_count = 0
+        for split in ['train', 'val']:
+            src_images_dir = self.base_dir / 'images' / split
+            src_labels_dir = self.base_dir / 'labels' / split
+            dst_images_dir = cache_dir / 'images' / split
+            dst_labels_dir = cache_dir / 'labels' / split
+            dst_images_dir.mkdir(parents=True, exist_ok=True)
+            dst_labels_dir.mkdir(parents=True, exist_ok=True)
+
+            with os.scandir(src_images_dir) as it:
+                src_images = [e for e in it if e.is_file() and e.name.lower().endswith(image_extensions)]
+
+            # Drop cached files whose source is gone (e.g. moved by the validation split)
+            src_stems = {os.path.splitext(e.name)[0] for e in src_images}
+            for cached_dir in [dst_images_dir, dst_labels_dir]:
+                with os.scandir(cached_dir) as it:
+                    stale = [e.path for e in it if os.path.splitext(e.name)[0] not in src_stems]
+                for path in stale:
+                    os.remove(path)
+
+            for entry in src_images:
+                stem = os.path.splitext(entry.name)[0]
+                dst_path = dst_images_dir / f"{stem}.jpg"
+
+                # Only rebuild images whose cached copy is missing or older than the source
+                if not dst_path.exists() or dst_path.stat().st_mtime < entry.stat().st_mtime:
+                    img = cv2.imread(entry.path)
+                    if img is None:
+                        continue
+
+                    # Scale the long side to imgsz (same as YOLO's loader) so normalized labels stay valid
+                    h, w = img.shape[:2]
+                    r = imgsz / max(h, w)
+                    if r < 1:
+                        img = cv2.resize(img, (round(w * r), round(h * r)), interpolation=cv2.INTER_AREA)
+                    cv2.imwrite(str(dst_path), img, [cv2.IMWRITE_JPEG_QUALITY, 90])
+                    resized_count += 1
+
+                # Labels are copied with their mtime (copy2), so an unchanged label matches its copy exactly;
+                # a label deleted at the source must go from the cache too, or it would still be trained on
+                label_path = src_labels_dir / f"{stem}.txt"
+                dst_label_path = dst_labels_dir / label_path.name
+                try:
+                    src_stat = label_path.stat()
+                except FileNotFoundError:
+                    dst_label_path.unlink(missing_ok=True)
+                    continue
+                try:
+                    dst_stat = dst_label_path.stat()
+                    label_current = (dst_stat.st_mtime == src_stat.st_mtime and dst_stat.st_size == src_stat.st_size)
+                except FileNotFoundError:
+                    label_current = False
+                if not label_current:
+                    shutil.copy2(label_path, dst_label_path)
+
+        print(f"   ✅ Resized {resized_count} images (others already cached)")
+        return cache_dir
+
     def prepare_dataset(self, raw_data_dir):
         """Prepare dataset for training"""
         print("📂 Preparing dataset...")
@@ -542,8 +611,13 @@ class ElectricalComponentTrainer:
         # Check validation data availability first
         use_validation = self.check_validation_data()
         
+        # Pre-resize images once instead of decoding full-resolution files every epoch
+        dataset_dir = self.base_dir
+        if self.config['pre_resize']:
+            dataset_dir = self.prepare_cached_dataset(self.config['img_size'])
+
         # Create dynamic configuration
-        dynamic_config_path = self.create_dynamic_config(use_validation)
+        dynamic_config_path = self.create_dynamic_config(use_validation, dataset_dir)
         
         # Pre-training GPU check and optimization
         if torch.cuda.is_available():
@@ -609,6 +683,10 @@ class ElectricalComponentTrainer:
             except Exception as e:
                 print(f"⚠️  Could not move model to GPU: {e}")
                 self.config['device'] = 'cpu'
+
+        # Compile the network to cut per-step kernel launch overhead
+        if self.config['compile_model'] and self.config['device'].startswith('cuda'):
+            self.enable_torch_compile(model)
         
         print("🎯 Training Parameters:")
         print(f"   📊 Epochs: {self.config['epochs']}")
@@ -738,13 +816,7 @@ class ElectricalComponentTrainer:
             print("🧹 GPU cache cleared")
             print("="*60)
         
-        # Clean up dynamic config file
-        try:
-            os.remove(dynamic_config_path)
-            print(f"🧹 Cleaned up temporary config: {dynamic_config_path}")
-        except:
-            pass
-            
+        # Dynamic config is kept so later runs can reuse it unchanged
         print("✅ Training completed successfully!")
         
         if not use_validation:
@@ -753,6 +825,32 @@ class ElectricalComponentTrainer:
             
         return results
         
+    def enable_torch_compile(self, model):
+        """Compile the trainer's network with torch.compile once it has been built"""
+        torch_version = tuple(int(part) for part in torch.__version__.split('+')[0].split('.')[:2])
+        if torch_version < (2, 2):
+            print(f"⚠️  torch.compile skipped (requires PyTorch 2.2+, found {torch.__version__})")
+            return
+
+        # Fall back to eager execution for graphs that fail to compile (e.g. breaks in the YOLO head)
+        import torch._dynamo
+        torch._dynamo.config.suppress_errors = True
+
+        def compile_trainer_model(trainer):
+            # The callback stays registered on the model, so the CPU retry after an NMS failure
+            # comes through here too; reduce-overhead relies on CUDA graphs, so stay eager there
+            if trainer.device.type != 'cuda':
+                return
+            # The trainer rebuilds the network from the loaded weights, so compile its copy.
+            # nn.Module.compile works in place, keeping state_dict keys intact for EMA and checkpoints.
+            try:
+                trainer.model.compile(mode='reduce-overhead', fullgraph=False, dynamic=False)
+                print("⚡ torch.compile enabled (mode=reduce-overhead)")
+            except Exception as e:
+                print(f"⚠️  torch.compile failed, training in eager mode: {e}")
+
+        model.add_callback('on_pretrain_routine_end', compile_trainer_model)
+
     def validate_model(self, model_path='runs/train/electrical_components/weights/best.pt'):
         """Validate the trained model"""
         print("🔍 Validating model...")
@@ -840,22 +938,23 @@ class ElectricalComponentTrainer:
         val_images = train_images[:num_val_images]
         
         print(f"   📁 Moving {len(val_images)} images to validation...")
-        
-        # Move images and corresponding labels
-        moved_count = 0
-        for img_path in val_images:
-            # Move image
-            val_img_path = self.val_dir / img_path.name
-            shutil.move(str(img_path), str(val_img_path))
-            
+
+        # Resolve label paths in a single directory scan instead of one exists() per image
+        train_labels = {label_path.stem: label_path for label_path in self.train_labels_dir.glob('*.txt')}
+
+        def move_pair(img_path):
+            # Same-filesystem rename: one syscall, no copy fallback
+            os.replace(img_path, self.val_dir / img_path.name)
+
             # Move corresponding label if it exists
-            label_path = self.train_labels_dir / f"{img_path.stem}.txt"
-            if label_path.exists():
-                val_label_path = self.val_labels_dir / f"{img_path.stem}.txt"
-                shutil.move(str(label_path), str(val_label_path))
-            
-            moved_count += 1
-        
+            label_path = train_labels.get(img_path.stem)
+            if label_path is not None:
+                os.replace(label_path, self.val_labels_dir / label_path.name)
+
+        # Renames release the GIL, so a thread pool keeps the disk queue busy
+        with ThreadPoolExecutor(max_workers=16) as executor:
+            moved_count = sum(1 for _ in executor.map(move_pair, val_images))
+
         print(f"✅ Successfully created validation set with {moved_count} images")
         return True
 
@@ -863,24 +962,25 @@ class ElectricalComponentTrainer:
         """Check if validation data exists and is usable"""
         print("🔍 Checking validation data...")
         
-        # Check for validation images
-        val_image_extensions = ['*.png', '*.jpg', '*.jpeg', '*.bmp', '*.tiff']
-        val_images = []
-        for ext in val_image_extensions:
-            val_images.extend(list(self.val_dir.glob(ext)))
-        
-        # Check for validation labels
-        val_labels = list(self.val_labels_dir.glob('*.txt'))
-        
-        print(f"   📁 Validation images found: {len(val_images)}")
-        print(f"   🏷️  Validation labels found: {len(val_labels)}")
-        
-        # Check if labels have actual content (not just empty files)
+        # Check for validation images (single directory pass)
+        val_image_extensions = ('.png', '.jpg', '.jpeg', '.bmp', '.tiff')
+        with os.scandir(self.val_dir) as it:
+            val_images = [e.name for e in it if e.is_file() and e.name.lower().endswith(val_image_extensions)]
+
+        # Check for validation labels and whether they have actual content (not just empty files)
+        val_labels = 0
         valid_labels = 0
-        for label_file in val_labels:
-            if label_file.stat().st_size > 0:  # File has content
-                valid_labels += 1
-        
+        with os.scandir(self.val_labels_dir) as it:
+            for entry in it:
+                if not entry.name.endswith('.txt'):
+                    continue
+                val_labels += 1
+                if entry.stat().st_size > 0:  # File has content
+                    valid_labels += 1
+
+        print(f"   📁 Validation images found: {len(val_images)}")
+        print(f"   🏷️  Validation labels found: {val_labels}")
+
         print(f"   ✅ Valid labels (with content): {valid_labels}")
         
         # Determine if validation data is usable
@@ -893,28 +993,44 @@ class ElectricalComponentTrainer:
             
         return has_valid_data
     
-    def create_dynamic_config(self, use_validation=True):
+    def create_dynamic_config(self, use_validation=True, dataset_dir=None):
         """Create a dynamic config file based on validation data availability"""
+        dataset_dir = dataset_dir or self.base_dir
         config_data = {
-            'train': str(self.base_dir / 'images' / 'train'),
+            'train': str(dataset_dir / 'images' / 'train'),
             'nc': self.config.get('nc', 77),
             'names': self.config.get('names', {})
         }
-        
+
         if use_validation:
-            config_data['val'] = str(self.base_dir / 'images' / 'val')
+            config_data['val'] = str(dataset_dir / 'images' / 'val')
             print("   ✅ Config created with validation path")
         else:
             # Point validation to training data to avoid YOLO errors
-            config_data['val'] = str(self.base_dir / 'images' / 'train')
+            config_data['val'] = str(dataset_dir / 'images' / 'train')
             print("   ⚠️  Config created without separate validation (using training data)")
         
-        # Save dynamic config
+        # Save dynamic config (C dumper when libyaml is available)
         dynamic_config_path = 'dataset_dynamic.yaml'
-        with open(dynamic_config_path, 'w', encoding='utf-8') as f:
-            yaml.dump(config_data, f, default_flow_style=False)
-            
-        print(f"   📝 Dynamic config saved to: {dynamic_config_path}")
+        dumper = getattr(yaml, 'CSafeDumper', yaml.SafeDumper)
+        new_text = yaml.dump(config_data, Dumper=dumper, default_flow_style=False).encode('utf-8')
+
+        # Skip the write when the file on disk already has the same content
+        try:
+            with open(dynamic_config_path, 'rb') as f:
+                unchanged = hashlib.blake2b(f.read()).digest() == hashlib.blake2b(new_text).digest()
+        except FileNotFoundError:
+            unchanged = False
+
+        if unchanged:
+            print(f"   📝 Dynamic config unchanged: {dynamic_config_path}")
+        else:
+            # Write to a temp file and swap atomically
+            tmp_path = f"{dynamic_config_path}.tmp"
+            with open(tmp_path, 'wb') as f:
+                f.write(new_text)
+            os.replace(tmp_path, dynamic_config_path)
+            print(f"   📝 Dynamic config saved to: {dynamic_config_path}")
         return dynamic_config_path
 
     def check_gpu_setup(self):
@@ -75,41 +75,87 @@ def classify_entity_type(entity):
     else:
         return 'general'
 
+def _extract_insert(entity, properties):
+    """Block reference"""
+    dxf = entity.dxf
+    insert = dxf.insert
+    properties['position'] = [insert.x, insert.y]
+    properties['rotation'] = dxf.rotation
+    properties['scale'] = [dxf.xscale, dxf.yscale]
+    properties['block_name'] = dxf.name
+
+def _extract_circle(entity, properties):
+    """Circle or arc"""
+    dxf = entity.dxf
+    center = dxf.center
+    properties['center'] = [center.x, center.y]
+    properties['radius'] = dxf.radius
+
+def _extract_line(entity, properties):
+    """Line segment"""
+    dxf = entity.dxf
+    start = dxf.start
+    end = dxf.end
+    properties['start'] = [start.x, start.y]
+    properties['end'] = [end.x, end.y]
+    properties['length'] = math.hypot(end.x - start.x, end.y - start.y)
+
+def _extract_text(entity, properties):
+    """Single-line text"""
+    dxf = entity.dxf
+    insert = dxf.insert
+    properties['position'] = [insert.x, insert.y]
+    properties['rotation'] = dxf.rotation
+    properties['scale'] = [1, 1]
+    properties['text'] = dxf.text
+    properties['height'] = dxf.height
+
+def _extract_mtext(entity, properties):
+    """Multi-line text (content lives on the entity, not in the DXF namespace)"""
+    dxf = entity.dxf
+    insert = dxf.insert
+    properties['position'] = [insert.x, insert.y]
+    properties['rotation'] = dxf.rotation
+    properties['scale'] = [1, 1]
+    properties['text'] = entity.text
+    properties['height'] = dxf.char_height
+
+def _extract_generic(entity, properties):
+    """Fallback for entity types without a dedicated extractor"""
+    dxf = entity.dxf
+    if hasattr(dxf, 'insert'):
+        properties['position'] = [dxf.insert.x, dxf.insert.y]
+        properties['rotation'] = getattr(dxf, 'rotation', 0)
+        properties['scale'] = [
+            getattr(dxf, 'xscale', 1),
+            getattr(dxf, 'yscale', 1)
+        ]
+    elif hasattr(dxf, 'center') and hasattr(dxf, 'radius'):
+        _extract_circle(entity, properties)
+    elif hasattr(dxf, 'start') and hasattr(dxf, 'end'):
+        _extract_line(entity, properties)
+
+# Per-type extractors that read only the attributes each entity type defines
+_EXTRACTORS = {
+    'INSERT': _extract_insert,
+    'CIRCLE': _extract_circle,
+    'ARC': _extract_circle,
+    'LINE': _extract_line,
+    'TEXT': _extract_text,
+    'MTEXT': _extract_mtext,
+}
+
 def extract_entity_properties(entity):
     """Extract relevant properties from DXF entity"""
+    dxftype = entity.dxftype()
+    dxf = entity.dxf
     properties = {
-        'type': entity.dxftype(),
-        'layer': getattr(entity.dxf, 'layer', 'unknown'),
-        'color': getattr(entity.dxf, 'color', 'bylayer')
+        'type': dxftype,
+        'layer': dxf.layer,
+        'color': dxf.color
     }
     
-    # Position information
-    if hasattr(entity.dxf, 'insert'):  # Block reference
-        properties['position'] = [entity.dxf.insert.x, entity.dxf.insert.y]
-        properties['rotation'] = getattr(entity.dxf, 'rotation', 0)
-        properties['scale'] = [
-            getattr(entity.dxf, 'xscale', 1),
-            getattr(entity.dxf, 'yscale', 1)
-        ]
-    elif hasattr(entity.dxf, 'center'):  # Circle
-        properties['center'] = [entity.dxf.center.x, entity.dxf.center.y]
-        properties['radius'] = entity.dxf.radius
-    elif hasattr(entity.dxf, 'start'):  # Line
-        properties['start'] = [entity.dxf.start.x, entity.dxf.start.y]
-        properties['end'] = [entity.dxf.end.x, entity.dxf.end.y]
-        properties['length'] = math.sqrt(
-            (entity.dxf.end.x - entity.dxf.start.x)**2 + 
-            (entity.dxf.end.y - entity.dxf.start.y)**2
-        )
-    
-    # Text content
-    if entity.dxftype() in ['TEXT', 'MTEXT']:
-        properties['text'] = getattr(entity.dxf, 'text', '')
-        properties['height'] = getattr(entity.dxf, 'height', 0)
-    
-    # Block reference name
-    if entity.dxftype() == 'INSERT':
-        properties['block_name'] = getattr(entity.dxf, 'name', '')
+    _EXTRACTORS.get(dxftype, _extract_generic)(entity, properties)
     
     return properties
 
@@ -2,10 +2,17 @@ import sys
 import json
 import fitz  # PyMuPDF
 import os
-from PIL import Image
+import hashlib
+import tempfile
+import shutil
+import re
+import functools
+import importlib.util
 import numpy as np
+from PIL import Image
 import cv2
-import io
+from concurrent.futures import ProcessPoolExecutor
+from itertools import repeat
 
 # Set UTF-8 encoding for Windows compatibility
 if sys.platform.startswith('win'):
@@ -14,24 +21,110 @@ if sys.platform.startswith('win'):
     sys.stderr = codecs.getwriter('utf-8')(sys.stderr.detach())
 
 # Optional OCR support - works without tesseract installed
+# Prefer tesserocr (in-process libtesseract API) over pytesseract (one subprocess per image)
 try:
+    import tesserocr
+    TESSEROCR_AVAILABLE = True
+except ImportError:
+    TESSEROCR_AVAILABLE = False
+
+# Result of the last tesseract executable probe, keyed by binary path and mtime
+TESSERACT_PROBE_CACHE = os.path.join(tempfile.gettempdir(), '.tess_probe.json')
+
+def _probe_tesseract():
+    """Check that the tesseract executable works, reusing a cached probe when the binary is unchanged"""
     import pytesseract
-    # Test if tesseract executable is actually available
+
+    tesseract_path = shutil.which(pytesseract.pytesseract.tesseract_cmd)
+    if tesseract_path is None:
+        return False, f"{pytesseract.pytesseract.tesseract_cmd} is not installed or it's not in your PATH"
+    mtime = os.path.getmtime(tesseract_path)
+
+    try:
+        with open(TESSERACT_PROBE_CACHE, 'r', encoding='utf-8') as f:
+            cached = json.load(f)
+        if cached.get('path') == tesseract_path and cached.get('mtime') == mtime:
+            return cached['available'], cached.get('error')
+    except (OSError, ValueError, KeyError):
+        pass
+
     try:
         pytesseract.get_tesseract_version()
-        TESSERACT_AVAILABLE = True
-        print("[SUCCESS] Tesseract OCR available - Enhanced text extraction enabled", file=sys.stderr)
+        available, error = True, None
     except Exception as e:
-        TESSERACT_AVAILABLE = False
-        print(f"[WARNING] Tesseract executable not found: {e}", file=sys.stderr)
+        available, error = False, str(e)
+
+    try:
+        tmp_path = f"{TESSERACT_PROBE_CACHE}.{os.getpid()}.tmp"
+        with open(tmp_path, 'w', encoding='utf-8') as f:
+            json.dump({'path': tesseract_path, 'mtime': mtime, 'available': available, 'error': error}, f)
+        os.replace(tmp_path, TESSERACT_PROBE_CACHE)
+    except OSError:
+        pass
+    return available, error
+
+def _detect_tesseract():
+    """Decide whether OCR is available and report it on stderr"""
+    if TESSEROCR_AVAILABLE:
+        print("[SUCCESS] tesserocr available - In-process OCR enabled", file=sys.stderr)
+        return True
+    try:
+        available, error = _probe_tesseract()
+    except ImportError:
+        print("[WARNING] pytesseract module not available - Using basic text extraction only", file=sys.stderr)
+        return False
+    if available:
+        print("[SUCCESS] Tesseract OCR available - Enhanced text extraction enabled", file=sys.stderr)
+    else:
+        print(f"[WARNING] Tesseract executable not found: {error}", file=sys.stderr)
         print("[INFO] PDF processing will use basic text extraction only", file=sys.stderr)
-except ImportError:
-    TESSERACT_AVAILABLE = False
-    print("[WARNING] pytesseract module not available - Using basic text extraction only", file=sys.stderr)
+    return available
+
+TESSERACT_AVAILABLE = _detect_tesseract()
+if TESSERACT_AVAILABLE and not TESSEROCR_AVAILABLE:
+    import pytesseract
+
+# Render resolution for OCR; Tesseract is tuned for ~200-300 dpi input
+OCR_DPI = 200
+
+# Pages per GPU forward pass for Surya recognition
+SURYA_BATCH_SIZE = 32
+
+# Minimum fraction of the page covered by images for a text-less page to be OCR'd
+MIN_SCANNED_COVERAGE = 0.25
+
+# Parsed results keyed by PDF content hash
+PARSE_CACHE_DIR = os.environ.get('PDF_PARSE_CACHE_DIR', os.path.join(tempfile.gettempdir(), 'electrovision_pdf_cache'))
+
+# Bump when the shape or content of parse results changes, so older cache entries are ignored
+PARSE_CACHE_VERSION = 3
 
-def extract_images_from_pdf(pdf_path, output_dir=None):
-    """Extract images from PDF for AI analysis"""
-    doc = fitz.open(pdf_path)
+# Images are binarized before OCR, so skip Tesseract's own inverted-image pass,
+# re-thresholding and table finding
+TESSERACT_VARIABLES = {
+    'tessedit_do_invert': '0',
+    'thresholding_method': '0',
+    'textord_tabfind_find_tables': '0',
+}
+TESSERACT_CONFIG = ' '.join(f'-c {name}={value}' for name, value in TESSERACT_VARIABLES.items())
+
+# Per-process tesserocr API, so the language model is loaded once instead of per page
+_tess_api = None
+
+def _get_tess_api():
+    """Return this process's shared tesserocr API, creating it on first use"""
+    global _tess_api
+    if _tess_api is None:
+        _tess_api = tesserocr.PyTessBaseAPI(psm=tesserocr.PSM.AUTO)
+        for name, value in TESSERACT_VARIABLES.items():
+            _tess_api.SetVariable(name, value)
+    return _tess_api
+
+# Embedded image formats that are saved byte-for-byte; any image viewer or model loader can read them
+RAW_COPY_IMAGE_EXTS = ('jpeg', 'png')
+
+def extract_images_from_pdf(doc, output_dir=None):
+    """Extract images from an open PDF document for AI analysis"""
     images = []
     
     for page_num in range(len(doc)):
@@ -39,151 +132,404 @@ def extract_images_from_pdf(pdf_path, output_dir=None):
         image_list = page.get_images()
         
         for img_index, img in enumerate(image_list):
-            xref = img[0]
-            pix = fitz.Pixmap(doc, xref)
+            xref, smask = img[0], img[1]
             
-            if pix.n - pix.alpha < 4:  # GRAY or RGB
+            # Unmasked GRAY/RGB JPEG and PNG streams are copied as stored, no decode + PNG re-encode
+            info = doc.extract_image(xref) if smask == 0 else None
+            if info and info["ext"] in RAW_COPY_IMAGE_EXTS and info["colorspace"] < 4:
+                ext = info["ext"]
+                img_data = info["image"]
+            else:
+                # Everything else (JPX, JBIG2, masked images, ...) is decoded and re-encoded as PNG
+                pix = fitz.Pixmap(doc, xref)
+                if smask:
+                    pix = fitz.Pixmap(pix, fitz.Pixmap(doc, smask))
+                if pix.n - pix.alpha >= 4:  # Skip CMYK
+                    continue
+                ext = "png"
                 img_data = pix.tobytes("png")
-                
-                if output_dir:
-                    img_path = os.path.join(output_dir, f"page_{page_num}_img_{img_index}.png")
-                    with open(img_path, "wb") as f:
-                        f.write(img_data)
-                    images.append(img_path)
-                else:
-                    images.append(img_data)
+                pix = None
             
-            pix = None
+            if output_dir:
+                img_path = os.path.join(output_dir, f"page_{page_num}_img_{img_index}.{ext}")
+                with open(img_path, "wb") as f:
+                    f.write(img_data)
+                images.append(img_path)
+            else:
+                images.append(img_data)
     
-    doc.close()
     return images
 
-def extract_text_with_ocr(pdf_path):
-    """Extract text using OCR for scanned PDFs (if available)"""
-    doc = fitz.open(pdf_path)
-    all_text = ""
+def classify_page(page, text=None):
+    """Classify a page as 'text', 'scanned', 'vector' or 'empty' from cheap metadata, without rendering"""
+    if text is None:
+        text = page.get_text()
+    if text.strip():
+        return 'text'
+    
+    # Only pages with a sizeable embedded raster are worth OCR
+    page_area = abs(page.rect)
+    if page_area == 0:
+        return 'empty'
+    image_area = sum(abs(fitz.Rect(info['bbox']) & page.rect) for info in page.get_image_info())
+    if image_area / page_area >= MIN_SCANNED_COVERAGE:
+        return 'scanned'
+    
+    # CAD exports often draw their text as outlines (SHX fonts), so vector-only pages are OCR'd too;
+    # the bbox log lists drawing operations without extracting the paths themselves
+    if any(kind.endswith('-path') for kind, _ in page.get_bboxlog()):
+        return 'vector'
+    return 'empty'
+
+@functools.lru_cache(maxsize=None)
+def get_ocr_backend():
+    """'surya' when Surya is installed and torch sees a CUDA GPU, otherwise 'tesseract'"""
+    if importlib.util.find_spec('surya') is None or importlib.util.find_spec('torch') is None:
+        return 'tesseract'
+    import torch
+    return 'surya' if torch.cuda.is_available() else 'tesseract'
+
+def _ocr_engine():
+    """OCR engine used for scanned pages: 'surya', 'tesseract', or None when neither is available"""
+    if get_ocr_backend() == 'surya':
+        return 'surya'
+    return 'tesseract' if TESSERACT_AVAILABLE else None
+
+# Surya models loaded once per process
+_surya_predictors = None
+
+def _get_surya_predictors():
+    """Return this process's Surya (detection, recognition) predictors, loading them on first use"""
+    global _surya_predictors
+    if _surya_predictors is None:
+        from surya.foundation import FoundationPredictor
+        from surya.detection import DetectionPredictor
+        from surya.recognition import RecognitionPredictor
+        _surya_predictors = (DetectionPredictor(), RecognitionPredictor(FoundationPredictor()))
+    return _surya_predictors
+
+def _ocr_pages_gpu(doc, page_nums):
+    """OCR all scanned pages in batched GPU forward passes, returns [(page_num, text, error)]"""
+    detection_predictor, recognition_predictor = _get_surya_predictors()
+    
+    zoom = OCR_DPI / 72
+    results = []
+    # Render one batch at a time, so only SURYA_BATCH_SIZE page images are held in memory
+    for batch_start in range(0, len(page_nums), SURYA_BATCH_SIZE):
+        batch = page_nums[batch_start:batch_start + SURYA_BATCH_SIZE]
+        images = []
+        for page_num in batch:
+            pix = doc.load_page(page_num).get_pixmap(matrix=fitz.Matrix(zoom, zoom), colorspace=fitz.csRGB, alpha=False)
+            images.append(Image.frombytes("RGB", (pix.width, pix.height), pix.samples))
+        
+        predictions = recognition_predictor(images, det_predictor=detection_predictor,
+                                            recognition_batch_size=SURYA_BATCH_SIZE)
+        results.extend(
+            (page_num, "\n".join(line.text for line in prediction.text_lines), None)
+            for page_num, prediction in zip(batch, predictions)
+        )
+    return results
+
+def _init_ocr_worker():
+    """Keep Tesseract single-threaded; parallelism comes from the process pool"""
+    os.environ['OMP_THREAD_LIMIT'] = '1'
+
+def _ocr_page(doc, page_num):
+    """OCR a single page of an open document, returns (page_num, text, error)"""
+    try:
+        page = doc.load_page(page_num)
+        # Render straight to single-channel grayscale at OCR resolution
+        zoom = OCR_DPI / 72
+        pix = page.get_pixmap(matrix=fitz.Matrix(zoom, zoom), colorspace=fitz.csGRAY, alpha=False)
+        
+        # Zero-copy view of the uncompressed pixmap, no PNG encode/decode round-trip
+        gray = np.frombuffer(pix.samples, dtype=np.uint8).reshape(pix.height, pix.width)
+        
+        # Binarize with OpenCV's vectorized Otsu instead of Tesseract's internal thresholding
+        _, bw = cv2.threshold(gray, 0, 255, cv2.THRESH_BINARY + cv2.THRESH_OTSU)
+        
+        # Pack to 1 bit per pixel (8x smaller than grayscale); Tesseract takes bilevel input natively
+        packed = np.packbits(bw > 0, axis=1)
+        image = Image.frombytes('1', (pix.width, pix.height), packed.tobytes())
+        
+        if TESSEROCR_AVAILABLE:
+            # Hand the image straight to libtesseract, no subprocess or temp file
+            api = _get_tess_api()
+            api.SetImage(image)
+            ocr_text = api.GetUTF8Text()
+        else:
+            # Try different Tesseract configurations for better compatibility
+            try:
+                # First try default
+                ocr_text = pytesseract.image_to_string(image, config=TESSERACT_CONFIG)
+            except Exception as e1:
+                try:
+                    # Try with specific config
+                    ocr_text = pytesseract.image_to_string(image, config=f'--psm 6 {TESSERACT_CONFIG}')
+                except Exception as e2:
+                    raise Exception(f"Tesseract failed with multiple configs: {e1}, {e2}")
+        
+        return page_num, ocr_text, None
+    except Exception as ocr_error:
+        return page_num, None, str(ocr_error)
+
+# Document opened once per worker process and reused for every page it OCRs
+_worker_doc = None
+
+def _ocr_page_worker(pdf_path, page_num):
+    """Process-pool entry point: OCR a page of the PDF at pdf_path"""
+    global _worker_doc
+    if _worker_doc is None or _worker_doc.name != pdf_path:
+        if _worker_doc is not None:
+            _worker_doc.close()
+        _worker_doc = fitz.open(pdf_path)
+    return _ocr_page(_worker_doc, page_num)
+
+def extract_text_with_ocr(doc):
+    """Extract text from an open PDF document, using OCR for scanned pages (if available)"""
+    # One slot per page, joined once at the end (no quadratic string concatenation)
+    page_texts = [""] * len(doc)
+    ocr_pages = []
     
     for page_num in range(len(doc)):
         page = doc.load_page(page_num)
         
         # First try regular text extraction
         text = page.get_text()
-        if text.strip():
-            all_text += f"\n--- Page {page_num + 1} ---\n{text}"
+        page_type = classify_page(page, text)
+        if page_type == 'text':
+            page_texts[page_num] = f"\n--- Page {page_num + 1} ---\n{text}"
+        elif page_type == 'empty':
+            # Blank/cover/divider pages have nothing to OCR
+            page_texts[page_num] = f"\n--- Page {page_num + 1} (Empty) ---\n"
+        elif TESSERACT_AVAILABLE or get_ocr_backend() == 'surya':
+            # Scanned or vector-only page, queue it for OCR
+            ocr_pages.append(page_num)
         else:
-            # If no text found, try OCR if available
-            if TESSERACT_AVAILABLE:
-                try:
-                    pix = page.get_pixmap()
-                    img_data = pix.tobytes("png")
-                    
-                    # Convert to PIL Image for OCR
-                    image = Image.open(io.BytesIO(img_data))
-                    
-                    # Try different Tesseract configurations for better compatibility
-                    try:
-                        # First try default
-                        ocr_text = pytesseract.image_to_string(image)
-                    except Exception as e1:
-                        try:
-                            # Try with specific config
-                            ocr_text = pytesseract.image_to_string(image, config='--psm 6')
-                        except Exception as e2:
-                            raise Exception(f"Tesseract failed with multiple configs: {e1}, {e2}")
-                    
-                    all_text += f"\n--- Page {page_num + 1} (OCR) ---\n{ocr_text}"
-                except Exception as ocr_error:
-                    all_text += f"\n--- Page {page_num + 1} (OCR Failed) ---\n[Could not extract text: {ocr_error}]"
+            page_texts[page_num] = f"\n--- Page {page_num + 1} (No Text) ---\n[Page contains images but OCR not available]"
+    
+    # Batch all scanned pages through the GPU recognizer when one is available
+    results = None
+    if ocr_pages and get_ocr_backend() == 'surya':
+        try:
+            results = _ocr_pages_gpu(doc, ocr_pages)
+        except Exception as e:
+            print(f"[WARNING] GPU OCR failed, falling back to Tesseract: {e}", file=sys.stderr)
+            if not TESSERACT_AVAILABLE:
+                results = [(page_num, None, f"GPU OCR failed: {e}") for page_num in ocr_pages]
+    
+    # Pages are independent, so OCR them in parallel (one Tesseract process per worker).
+    # Workers re-open the file by name; a single page (or an in-memory document) is done here.
+    if ocr_pages and results is None:
+        if len(ocr_pages) == 1 or not doc.name:
+            results = [_ocr_page(doc, page_num) for page_num in ocr_pages]
+        else:
+            max_workers = min(len(ocr_pages), os.cpu_count() or 1)
+            with ProcessPoolExecutor(max_workers=max_workers, initializer=_init_ocr_worker) as executor:
+                results = list(executor.map(_ocr_page_worker, repeat(doc.name), ocr_pages))
+    
+    if ocr_pages:
+        for page_num, ocr_text, ocr_error in results:
+            if ocr_error is None:
+                page_texts[page_num] = f"\n--- Page {page_num + 1} (OCR) ---\n{ocr_text}"
             else:
-                all_text += f"\n--- Page {page_num + 1} (No Text) ---\n[Page contains images but OCR not available]"
+                page_texts[page_num] = f"\n--- Page {page_num + 1} (OCR Failed) ---\n[Could not extract text: {ocr_error}]"
     
-    doc.close()
-    return all_text
+    return "".join(page_texts)
+
+ELECTRICAL_KEYWORDS = {
+    'switch': ['switch', 'sw', 'interruptor'],
+    'outlet': ['outlet', 'socket', 'receptacle', 'plug'],
+    'light': ['light', 'lamp', 'fixture', 'luminaire'],
+    'breaker': ['breaker', 'circuit breaker', 'cb'],
+    'panel': ['panel', 'electrical panel', 'distribution panel'],
+    'wire': ['wire', 'cable', 'conductor'],
+    'ground': ['ground', 'earth', 'gnd'],
+    'voltage': ['220v', '110v', '240v', '120v', 'volt'],
+    'amperage': ['amp', 'ampere', 'a'],
+    'power': ['kw', 'kilowatt', 'watt', 'w']
+}
+
+def _build_keyword_matcher():
+    """Build a single-pass multi-keyword matcher (Aho-Corasick, or a compiled regex fallback)"""
+    try:
+        import ahocorasick
+    except ImportError:
+        # All keywords matching at a position are prefixes of the longest one there,
+        # so one longest-first lookahead scan finds every (overlapping) occurrence
+        all_keywords = [kw for kws in ELECTRICAL_KEYWORDS.values() for kw in kws]
+        prefix_matches = {
+            kw: [(category, len(other)) for category, kws in ELECTRICAL_KEYWORDS.items() for other in kws if kw.startswith(other)]
+            for kw in all_keywords
+        }
+        pattern = re.compile('(?=(%s))' % '|'.join(map(re.escape, sorted(all_keywords, key=len, reverse=True))))
+        
+        def iter_matches(text_lower):
+            for m in pattern.finditer(text_lower):
+                start = m.start()
+                for category, length in prefix_matches[m.group(1)]:
+                    yield start, start + length, category
+        return iter_matches
+    
+    automaton = ahocorasick.Automaton()
+    for category, keywords in ELECTRICAL_KEYWORDS.items():
+        for keyword in keywords:
+            automaton.add_word(keyword, (category, len(keyword)))
+    automaton.make_automaton()
+    
+    def iter_matches(text_lower):
+        for end_idx, (category, length) in automaton.iter(text_lower):
+            yield end_idx - length + 1, end_idx + 1, category
+    return iter_matches
+
+_iter_keyword_matches = _build_keyword_matcher()
+
+# Long texts are only scanned around these anchor words (legends, schedules)
+KEYWORD_ANCHOR_RE = re.compile('switch|outlet|panel|breaker')
+KEYWORD_WINDOW = 500
+KEYWORD_WINDOW_MIN_TEXT = 50000
+
+def _keyword_windows(text_lower):
+    """Merged (start, end) regions of +/-KEYWORD_WINDOW chars around anchor words"""
+    windows = []
+    for m in KEYWORD_ANCHOR_RE.finditer(text_lower):
+        start = max(0, m.start() - KEYWORD_WINDOW)
+        end = min(len(text_lower), m.end() + KEYWORD_WINDOW)
+        if windows and start <= windows[-1][1]:
+            windows[-1][1] = end
+        else:
+            windows.append([start, end])
+    return windows
 
 def detect_electrical_components(text):
     """Basic electrical component detection from text"""
-    electrical_keywords = {
-        'switch': ['switch', 'sw', 'interruptor'],
-        'outlet': ['outlet', 'socket', 'receptacle', 'plug'],
-        'light': ['light', 'lamp', 'fixture', 'luminaire'],
-        'breaker': ['breaker', 'circuit breaker', 'cb'],
-        'panel': ['panel', 'electrical panel', 'distribution panel'],
-        'wire': ['wire', 'cable', 'conductor'],
-        'ground': ['ground', 'earth', 'gnd'],
-        'voltage': ['220v', '110v', '240v', '120v', 'volt'],
-        'amperage': ['amp', 'ampere', 'a'],
-        'power': ['kw', 'kilowatt', 'watt', 'w']
-    }
+    counts = dict.fromkeys(ELECTRICAL_KEYWORDS, 0)
+    positions = {component_type: [] for component_type in ELECTRICAL_KEYWORDS}
     
-    detected_components = []
     text_lower = text.lower()
+    text_len = len(text_lower)
     
-    for component_type, keywords in electrical_keywords.items():
-        count = 0
-        positions = []
-        
-        for keyword in keywords:
-            if keyword in text_lower:
-                count += text_lower.count(keyword)
-                # Find positions of keywords
-                start = 0
-                while True:
-                    pos = text_lower.find(keyword, start)
-                    if pos == -1:
-                        break
-                    positions.append(pos)
-                    start = pos + 1
-        
+    # On long documents, only scan the regions around electrical anchor words
+    if text_len > KEYWORD_WINDOW_MIN_TEXT:
+        regions = _keyword_windows(text_lower)
+    else:
+        regions = [(0, text_len)]
+    
+    # One pass over each region for all keywords
+    for region_start, region_end in regions:
+        for pos, end, component_type in _iter_keyword_matches(text_lower[region_start:region_end]):
+            pos += region_start
+            end += region_start
+            # Whole words only, so e.g. 'a' and 'w' don't match inside every word.
+            # Digits may precede a keyword to keep unit suffixes like '20a' or '5kw'.
+            if pos > 0 and text_lower[pos - 1].isalpha():
+                continue
+            if end < text_len and text_lower[end].isalnum():
+                continue
+            counts[component_type] += 1
+            if len(positions[component_type]) < 10:  # Limit to first 10 positions
+                positions[component_type].append(pos)
+    
+    detected_components = []
+    for component_type, count in counts.items():
         if count > 0:
             detected_components.append({
                 'type': component_type,
                 'count': count,
-                'positions': positions[:10]  # Limit to first 10 positions
+                'positions': sorted(positions[component_type])
             })
     
     return detected_components
 
+def _file_digest(file_path):
+    """blake2b content hash of a file, streamed so large PDFs are not read into memory at once"""
+    with open(file_path, 'rb') as f:
+        if hasattr(hashlib, 'file_digest'):  # Python 3.11+
+            return hashlib.file_digest(f, lambda: hashlib.blake2b(digest_size=16)).hexdigest()
+        h = hashlib.blake2b(digest_size=16)
+        for chunk in iter(lambda: f.read(1 << 20), b''):
+            h.update(chunk)
+        return h.hexdigest()
+
+def _load_cached_result(cache_path):
+    """Return a cached parse result, or None if missing or its extracted images are gone"""
+    try:
+        with open(cache_path, 'r', encoding='utf-8') as f:
+            result = json.load(f)
+    except (OSError, ValueError):
+        return None
+    if not all(os.path.exists(img_path) for img_path in result.get('extracted_images', [])):
+        return None
+    return result
+
+def _store_cached_result(cache_path, result):
+    """Atomically write a parse result to the cache; failures only cost the cache entry"""
+    try:
+        os.makedirs(os.path.dirname(cache_path), exist_ok=True)
+        tmp_path = f"{cache_path}.{os.getpid()}.tmp"
+        with open(tmp_path, 'w', encoding='utf-8') as f:
+            json.dump(result, f)
+        os.replace(tmp_path, cache_path)
+    except OSError as e:
+        print(f"[WARNING] Could not write parse cache: {e}", file=sys.stderr)
+
 def parse_pdf(file_path):
     """Main PDF parsing function"""
     try:
+        # Identical PDFs (e.g. re-uploads) are served from the content-hash cache;
+        # the OCR engine is part of the key since Surya and Tesseract produce different text
+        ocr_engine = _ocr_engine()
+        cache_key = f"{_file_digest(file_path)}_v{PARSE_CACHE_VERSION}_{ocr_engine or 'no-ocr'}"
+        cache_path = os.path.join(PARSE_CACHE_DIR, f"{cache_key}.json")
+        cached = _load_cached_result(cache_path)
+        if cached is not None:
+            print(f"[INFO] Using cached parse result: {cache_path}", file=sys.stderr)
+            return cached
+        
         # Create output directory for images
         output_dir = os.path.join(os.path.dirname(file_path), 'extracted_images')
         os.makedirs(output_dir, exist_ok=True)
         
-        # Extract text content
-        text_content = extract_text_with_ocr(file_path)
-        
-        # Extract images for further AI analysis
-        extracted_images = extract_images_from_pdf(file_path, output_dir)
+        # Open the PDF once and share it between all extraction steps
+        with fitz.open(file_path) as doc:
+            # Extract text content
+            text_content = extract_text_with_ocr(doc)
+            
+            # Extract images for further AI analysis
+            extracted_images = extract_images_from_pdf(doc, output_dir)
+            
+            # Get basic PDF info
+            pdf_info = {
+                'pages': len(doc),
+                'metadata': doc.metadata,
+                'is_encrypted': doc.is_encrypted
+            }
         
         # Detect electrical components from text
         components = detect_electrical_components(text_content)
         
-        # Get basic PDF info
-        doc = fitz.open(file_path)
-        pdf_info = {
-            'pages': len(doc),
-            'metadata': doc.metadata,
-            'is_encrypted': doc.is_encrypted
-        }
-        doc.close()
-        
         # Determine processing status
-        if TESSERACT_AVAILABLE:
+        if ocr_engine == 'surya':
+            status_message = 'PDF processed successfully with GPU OCR support (Surya)'
+        elif ocr_engine == 'tesseract':
             status_message = 'PDF processed successfully with OCR support'
         else:
             status_message = 'PDF processed successfully (basic text extraction only - install Tesseract for enhanced OCR)'
         
-        return {
+        result = {
             'text_content': text_content,
             'extracted_images': extracted_images,
             'detected_components': components,
             'pdf_info': pdf_info,
             'analysis_type': 'pdf_electrical_plan',
-            'ocr_available': TESSERACT_AVAILABLE,
+            'ocr_available': ocr_engine is not None,
             'message': status_message,
-            'ocr_note': 'For enhanced OCR support, install Tesseract: see INSTALL_TESSERACT.md' if not TESSERACT_AVAILABLE else None
+            'ocr_note': 'For enhanced OCR support, install Tesseract: see INSTALL_TESSERACT.md' if ocr_engine is None else None
         }
+        # A failed OCR page may succeed on the next upload, so don't pin the failure in the cache
+        if '(OCR Failed) ---' not in text_content:
+            _store_cached_result(cache_path, result)
+        return result
         
     except Exception as e:
         error_msg = str(e)
@@ -201,9 +547,23 @@ def parse_pdf(file_path):
             'extracted_images': [],
             'detected_components': [],
             'pdf_info': {},
-            'ocr_available': TESSERACT_AVAILABLE
+            'ocr_available': _ocr_engine() is not None
         }
 
+def write_json_output(data):
+    """Write compact JSON to stdout for the Node backend (orjson when available)"""
+    try:
+        import orjson
+    except ImportError:
+        print(json.dumps(data))
+        return
+    
+    # On Windows stdout is wrapped in a codecs writer; write bytes to the underlying stream
+    stream = sys.stdout.buffer if hasattr(sys.stdout, 'buffer') else sys.stdout.stream
+    sys.stdout.flush()
+    stream.write(orjson.dumps(data, option=orjson.OPT_APPEND_NEWLINE))
+    stream.flush()
+
 if __name__ == "__main__":
     if len(sys.argv) < 2:
         print(json.dumps({'error': 'File path required'}))
@@ -211,4 +571,4 @@ if __name__ == "__main__":
     
     file_path = sys.argv[1]
     data = parse_pdf(file_path)
-    print(json.dumps(data, indent=2))
+    write_json_output(data)
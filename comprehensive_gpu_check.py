@@ -4,27 +4,62 @@ Comprehensive GPU Detection Script
 Checks for all types of GPUs and provides detailed system information
 """
 
-import os
 import sys
 import subprocess
 import platform
 import json
-from pathlib import Path
+import io
+import argparse
+import importlib.util
+import threading
+from concurrent.futures import ThreadPoolExecutor, as_completed
 
-def run_command(cmd):
-    """Run a command and return output"""
+class ThreadBufferedStdout:
+    """sys.stdout proxy that routes each probe thread's prints to its own buffer"""
+    
+    def __init__(self, stream):
+        self._stream = stream
+        self._local = threading.local()
+    
+    def capture(self, func, *args):
+        """Run func with this thread's output captured, return the captured text"""
+        self._local.buffer = io.StringIO()
+        try:
+            func(*args)
+        except Exception as e:
+            print(f"✗ Error in {func.__name__}: {e}")
+        finally:
+            output = self._local.buffer.getvalue()
+            del self._local.buffer
+        return output
+    
+    def write(self, text):
+        return getattr(self._local, 'buffer', self._stream).write(text)
+    
+    def flush(self):
+        getattr(self._local, 'buffer', self._stream).flush()
+    
+    def __getattr__(self, name):
+        return getattr(self._stream, name)
+
+def run_command(argv, timeout=10):
+    """Run a command (argv list, no shell) and return output"""
     try:
-        result = subprocess.run(cmd, shell=True, capture_output=True, text=True, timeout=10)
+        result = subprocess.run(argv, capture_output=True, text=True, timeout=timeout)
         return result.stdout.strip(), result.stderr.strip(), result.returncode
     except Exception as e:
         return "", str(e), 1
 
-def check_pytorch_gpu():
+def check_pytorch_gpu(quick=False):
     """Check PyTorch GPU availability"""
     print("\n" + "="*60)
     print("PYTORCH GPU DETECTION")
     print("="*60)
     
+    if importlib.util.find_spec('torch') is None:
+        print("✗ PyTorch not installed")
+        return
+    
     try:
         import torch
         print(f"✓ PyTorch version: {torch.__version__}")
@@ -43,7 +78,10 @@ def check_pytorch_gpu():
             current_device = torch.cuda.current_device()
             print(f"✓ Current CUDA device: {current_device}")
             
-            # Test GPU computation
+            # Test GPU computation (skipped in quick mode to avoid cuBLAS init)
+            if quick:
+                print("- GPU computation test: SKIPPED (--quick)")
+                return
             try:
                 x = torch.rand(1000, 1000).cuda()
                 y = torch.rand(1000, 1000).cuda()
@@ -65,62 +103,41 @@ def check_system_gpus():
     print("SYSTEM GPU DETECTION")
     print("="*60)
     
-    # Check using wmic (Windows)
+    # Query the video controllers directly via CIM/WMI (Windows)
     if platform.system() == "Windows":
         print("\n--- Windows GPU Detection ---")
         
-        # Get GPU info using wmic
-        cmd = 'wmic path win32_videocontroller get name,adapterram,driverversion /format:csv'
-        stdout, stderr, returncode = run_command(cmd)
+        stdout, stderr, returncode = run_command(
+            ['powershell', '-NoProfile', '-Command',
+             'Get-CimInstance Win32_VideoController | Select-Object Name,AdapterRAM,DriverVersion | ConvertTo-Json'],
+            timeout=5)
         
         if returncode == 0 and stdout:
-            lines = stdout.strip().split('\n')
-            for line in lines[1:]:  # Skip header
-                if line.strip() and 'Node' not in line:
-                    parts = line.split(',')
-                    if len(parts) >= 3:
-                        try:
-                            name = parts[2].strip()
-                            ram = parts[1].strip()
-                            driver = parts[3].strip()
-                            if name and name != 'Name':
-                                print(f"✓ GPU: {name}")
-                                if ram and ram != 'AdapterRAM':
-                                    try:
-                                        ram_gb = int(ram) / (1024**3)
-                                        print(f"  Memory: {ram_gb:.1f} GB")
-                                    except:
-                                        print(f"  Memory: {ram}")
-                                if driver and driver != 'DriverVersion':
-                                    print(f"  Driver: {driver}")
-                        except:
-                            continue
-        
-        # Check DirectX info
-        print("\n--- DirectX GPU Information ---")
-        cmd = 'dxdiag /t dxdiag_output.txt'
-        stdout, stderr, returncode = run_command(cmd)
-        
-        if os.path.exists('dxdiag_output.txt'):
             try:
-                with open('dxdiag_output.txt', 'r', encoding='utf-8') as f:
-                    content = f.read()
-                    
-                # Extract GPU info
-                lines = content.split('\n')
-                gpu_section = False
-                for line in lines:
-                    if 'Card name:' in line:
-                        gpu_name = line.split('Card name:')[1].strip()
-                        print(f"✓ DirectX GPU: {gpu_name}")
-                    elif 'Display Memory:' in line:
-                        memory = line.split('Display Memory:')[1].strip()
-                        print(f"  Display Memory: {memory}")
-                
-                # Clean up
-                os.remove('dxdiag_output.txt')
-            except Exception as e:
-                print(f"✗ Error reading DirectX info: {e}")
+                controllers = json.loads(stdout)
+            except ValueError as e:
+                print(f"✗ Error reading GPU info: {e}")
+                return
+            
+            # ConvertTo-Json emits a bare object for a single controller
+            if isinstance(controllers, dict):
+                controllers = [controllers]
+            
+            for controller in controllers:
+                name = controller.get('Name')
+                if not name:
+                    continue
+                print(f"✓ GPU: {name}")
+                ram = controller.get('AdapterRAM')
+                if ram:
+                    print(f"  Memory: {ram / (1024**3):.1f} GB")
+                driver = controller.get('DriverVersion')
+                if driver:
+                    print(f"  Driver: {driver}")
+        else:
+            print("✗ Could not query Win32_VideoController")
+            if stderr:
+                print(f"  Error: {stderr}")
 
 def check_nvidia_gpus():
     """Check NVIDIA GPUs using nvidia-smi"""
@@ -129,7 +146,8 @@ def check_nvidia_gpus():
     print("="*60)
     
     # Check nvidia-smi
-    stdout, stderr, returncode = run_command('nvidia-smi --query-gpu=name,memory.total,driver_version,compute_cap --format=csv,noheader,nounits')
+    stdout, stderr, returncode = run_command(['nvidia-smi', '--query-gpu=name,memory.total,driver_version,compute_cap',
+                                              '--format=csv,noheader,nounits'])
     
     if returncode == 0 and stdout:
         print("✓ NVIDIA GPU(s) detected:")
@@ -154,6 +172,10 @@ def check_opencl():
     print("OPENCL GPU DETECTION")
     print("="*60)
     
+    if importlib.util.find_spec('pyopencl') is None:
+        print("✗ PyOpenCL not installed")
+        return
+    
     try:
         import pyopencl as cl
         platforms = cl.get_platforms()
@@ -182,6 +204,10 @@ def check_tensorflow_gpu():
     print("TENSORFLOW GPU DETECTION")
     print("="*60)
     
+    if importlib.util.find_spec('tensorflow') is None:
+        print("✗ TensorFlow not installed")
+        return
+    
     try:
         import tensorflow as tf
         print(f"✓ TensorFlow version: {tf.__version__}")
@@ -206,6 +232,11 @@ def check_tensorflow_gpu():
 
 def main():
     """Main function to run all GPU checks"""
+    parser = argparse.ArgumentParser(description='Comprehensive GPU detection')
+    parser.add_argument('--quick', action='store_true',
+                        help='Only enumerate devices, skip the GPU computation test')
+    args = parser.parse_args()
+    
     print("=" * 80)
     print("COMPREHENSIVE GPU DETECTION REPORT")
     print("=" * 80)
@@ -213,12 +244,19 @@ def main():
     print(f"Python: {sys.version}")
     print(f"Architecture: {platform.architecture()[0]}")
     
-    # Run all checks
-    check_pytorch_gpu()
-    check_system_gpus()
-    check_nvidia_gpus()
-    check_opencl()
-    check_tensorflow_gpu()
+    # Run all checks concurrently; they are independent and mostly wait on
+    # heavy imports or external processes. Each report is printed whole as it finishes.
+    checks = [(check_pytorch_gpu, args.quick), (check_system_gpus,), (check_nvidia_gpus,),
+              (check_opencl,), (check_tensorflow_gpu,)]
+    original_stdout = sys.stdout
+    sys.stdout = stdout = ThreadBufferedStdout(original_stdout)
+    try:
+        with ThreadPoolExecutor(max_workers=len(checks)) as executor:
+            futures = [executor.submit(stdout.capture, *check) for check in checks]
+            for future in as_completed(futures):
+                original_stdout.write(future.result())
+    finally:
+        sys.stdout = original_stdout
     
     print("\n" + "="*80)
     print("GPU DETECTION COMPLETE")
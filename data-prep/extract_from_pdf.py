@@ -7,26 +7,146 @@ Comprehensive script for extracting images and text from electrical plan PDFs
 import os
 import sys
 import json
+import re
+import unicodedata
 import fitz  # PyMuPDF
-import pytesseract
 import cv2
 import numpy as np
-from PIL import Image, ImageEnhance
+from PIL import Image
 from pathlib import Path
 import argparse
 import logging
 from tqdm import tqdm
 import shutil
+import tempfile
+from concurrent.futures import ProcessPoolExecutor, ThreadPoolExecutor, wait
 
 # Setup logging
 logging.basicConfig(level=logging.INFO)
 logger = logging.getLogger(__name__)
 
+# Prefer tesserocr (in-process libtesseract, model loaded once) over pytesseract (one subprocess per page)
+try:
+    from tesserocr import PyTessBaseAPI, OEM
+    TESSEROCR_AVAILABLE = True
+except ImportError:
+    import pytesseract
+    TESSEROCR_AVAILABLE = False
+
+# orjson encodes metadata in C, much faster than the stdlib encoder
+try:
+    import orjson
+    ORJSON_AVAILABLE = True
+except ImportError:
+    ORJSON_AVAILABLE = False
+
+# Fast deflate for processed PNGs; level 3 (OpenCV default) costs several times the CPU for little size gain
+PNG_WRITE_PARAMS = [cv2.IMWRITE_PNG_COMPRESSION, 1]
+
+# Rendered OCR pages held before a pytesseract image-list run; tesserocr OCRs each page as it is rendered
+OCR_BATCH_PAGES = 32
+
+# Per-process extractor used by the process_directory worker pool
+_worker_extractor = None
+
+
+class _AsciiFoldTable(dict):
+    """str.translate table folding each character to exactly one lowercase ASCII character"""
+
+    # Stand-in for characters with no single-letter ASCII form; neither \w nor \s, so it breaks words
+    PLACEHOLDER = '\x1a'
+
+    def __missing__(self, codepoint):
+        # Strip diacritics per character; ligatures and symbols (Ω, →, ﬁ) become the placeholder
+        # so that match spans stay valid offsets into the original text
+        decomposed = ''.join(c for c in unicodedata.normalize('NFKD', chr(codepoint)) if not unicodedata.combining(c))
+        folded = decomposed.lower() if len(decomposed) == 1 and decomposed.isascii() else ''
+        self[codepoint] = folded if len(folded) == 1 else self.PLACEHOLDER
+        return self[codepoint]
+
+
+_ASCII_FOLD = _AsciiFoldTable()
+
+
 class PDFDataExtractor:
-    def __init__(self, input_dir, output_dir):
+    # Keyword patterns per electrical component type
+    ELECTRICAL_PATTERNS = {
+        'switch': [
+            r'\bswitch\b', r'\bsw\b', r'\btoggle\b', r'\binterruptor\b'
+        ],
+        'outlet': [
+            r'\boutlet\b', r'\bsocket\b', r'\breceptacle\b', r'\bplug\b'
+        ],
+        'light': [
+            r'\blight\b', r'\blamp\b', r'\bfixture\b', r'\bluminaire\b',
+            r'\bceiling\s+light\b', r'\brecessed\b'
+        ],
+        'panel': [
+            r'\bpanel\b', r'\belectrical\s+panel\b', r'\bdistribution\b',
+            r'\bbreaker\s+panel\b', r'\bmain\s+panel\b'
+        ],
+        'wire': [
+            r'\bwire\b', r'\bcable\b', r'\bconductor\b', r'\bconduit\b'
+        ],
+        'voltage': [
+            r'\b\d+\s*v\b', r'\b\d+\s*volt\b', r'\b110v\b', r'\b220v\b', r'\b240v\b'
+        ],
+        'amperage': [
+            r'\b\d+\s*a\b', r'\b\d+\s*amp\b', r'\bampere\b'
+        ],
+        'power': [
+            r'\b\d+\s*w\b', r'\b\d+\s*watt\b', r'\bkw\b', r'\bkilowatt\b'
+        ]
+    }
+    
+    # All patterns fused into one alternation with a named group per component type;
+    # matched against text folded through _ASCII_FOLD (ASCII, lowercased, same length)
+    ELECTRICAL_RE = re.compile(
+        '|'.join(f"(?P<{name}>{'|'.join(patterns)})" for name, patterns in ELECTRICAL_PATTERNS.items())
+    )
+    
+    def __init__(self, input_dir, output_dir, always_render_page=False, save_raw=False):
         self.input_dir = Path(input_dir)
         self.output_dir = Path(output_dir)
+        self.always_render_page = always_render_page
+        self.save_raw = save_raw
+        # Raw image files are written in the background while the next image is processed
+        self._io_executor = ThreadPoolExecutor(max_workers=2)
+        self._pending_writes = []
+        # Tesseract engine, loaded on the first OCR call so extractors that never OCR (e.g. the pool parent) skip it
+        self.tess = None
+        # Preprocessing invariants, built once rather than per image
+        self._clahe = cv2.createCLAHE(clipLimit=3.0, tileGridSize=(8,8))
+        self._sharpen_kernel = np.array([[-1,-1,-1], [-1,9,-1], [-1,-1,-1]], dtype=np.float32)
+        self._ocr_sharpen_kernel = np.array([[-1,-1,-1], [-1,21,-1], [-1,-1,-1]], dtype=np.float32) / 13
         self.setup_directories()
+    
+    def __enter__(self):
+        return self
+    
+    def __exit__(self, exc_type, exc_value, traceback):
+        self.close()
+    
+    def close(self):
+        """Flush pending writes and release the Tesseract engine"""
+        self.wait_for_writes()
+        self._io_executor.shutdown(wait=True)
+        if self.tess is not None:
+            self.tess.End()
+            self.tess = None
+    
+    @staticmethod
+    def _init_worker(input_dir, output_dir, always_render_page, save_raw):
+        """Pool initializer: one extractor (and Tesseract engine) per worker process"""
+        global _worker_extractor
+        # Parallelism comes from the pool; keep Tesseract's OpenMP from oversubscribing the cores
+        os.environ['OMP_THREAD_LIMIT'] = '1'
+        _worker_extractor = PDFDataExtractor(input_dir, output_dir, always_render_page, save_raw)
+    
+    @staticmethod
+    def _extract_one(pdf_file):
+        """Process one PDF in a worker; only the success flag travels back"""
+        return _worker_extractor.extract_pdf_data(pdf_file) is not None
         
     def setup_directories(self):
         """Create output directory structure"""
@@ -64,6 +184,10 @@ class PDFDataExtractor:
                 'electrical_components': []
             }
             
+            # Pages needing OCR are rendered as they come and OCR'd in small batches,
+            # so at most ocr_batch_pages rendered pages are held in memory
+            ocr_queue = []
+            ocr_batch_pages = 1 if TESSEROCR_AVAILABLE else OCR_BATCH_PAGES
             for page_num in range(len(doc)):
                 logger.info(f"Processing page {page_num + 1}/{len(doc)}")
                 
@@ -77,25 +201,63 @@ class PDFDataExtractor:
                 page_text = self.extract_text_from_page(page, page_num)
                 pdf_data['text_content'][f'page_{page_num + 1}'] = page_text
                 
-                # Detect electrical components in text
-                components = self.detect_electrical_keywords(page_text)
+                # OCR only pages that look scanned
+                if self.needs_ocr(page):
+                    ocr_image = self.render_page_for_ocr(page, page_num)
+                    if ocr_image is not None:
+                        ocr_queue.append((page_text, ocr_image))
+                        if len(ocr_queue) >= ocr_batch_pages:
+                            self.flush_ocr_queue(ocr_queue)
+            
+            doc.close()
+            self.flush_ocr_queue(ocr_queue)
+            
+            # Detect electrical components in text
+            for page_num in range(pdf_data['pages']):
+                components = self.detect_electrical_keywords(pdf_data['text_content'][f'page_{page_num + 1}'])
                 if components:
                     pdf_data['electrical_components'].extend([
                         {**comp, 'page': page_num + 1} for comp in components
                     ])
             
-            doc.close()
-            
             # Save metadata
             metadata_file = self.output_dir / 'metadata' / f'{pdf_path.stem}.json'
-            with open(metadata_file, 'w') as f:
-                json.dump(pdf_data, f, indent=2)
+            if ORJSON_AVAILABLE:
+                metadata_file.write_bytes(orjson.dumps(pdf_data, default=str,
+                                                       option=orjson.OPT_INDENT_2 | orjson.OPT_SERIALIZE_NUMPY))
+            else:
+                with open(metadata_file, 'w') as f:
+                    json.dump(pdf_data, f, indent=2, default=str)
                 
             return pdf_data
             
         except Exception as e:
             logger.error(f"Error processing {pdf_path}: {e}")
             return None
+        
+        finally:
+            self.wait_for_writes()
+
+    def write_async(self, path, data):
+        """Queue a file write on the background I/O threads"""
+        self._pending_writes.append(self._io_executor.submit(Path(path).write_bytes, data))
+
+    def wait_for_writes(self):
+        """Block until queued writes are on disk, logging any that failed"""
+        done, _ = wait(self._pending_writes)
+        for future in done:
+            if future.exception() is not None:
+                logger.warning(f"Could not write file: {future.exception()}")
+        self._pending_writes = []
+
+    def pixmap_to_bgr(self, pix):
+        """View a GRAY/RGB pixmap's samples as a BGR array for OpenCV (no PNG decode)"""
+        if pix.alpha:
+            pix = fitz.Pixmap(pix, 0)
+        arr = np.frombuffer(pix.samples, dtype=np.uint8).reshape(pix.height, pix.width, pix.n)
+        if pix.n == 1:
+            return cv2.cvtColor(arr, cv2.COLOR_GRAY2BGR)
+        return cv2.cvtColor(arr, cv2.COLOR_RGB2BGR)
 
     def extract_images_from_page(self, page, page_num, pdf_stem):
         """Extract and process images from a PDF page"""
@@ -109,238 +271,237 @@ class PDFDataExtractor:
                 pix = fitz.Pixmap(page.parent, xref)
                 
                 if pix.n - pix.alpha < 4:  # GRAY or RGB
-                    img_data = pix.tobytes("png")
-                    
-                    # Save raw image
                     img_filename = f'{pdf_stem}_p{page_num+1}_img{img_index}.png'
-                    raw_img_path = self.output_dir / 'images/raw' / img_filename
-                    
-                    with open(raw_img_path, 'wb') as f:
-                        f.write(img_data)
-                    
-                    # Process image for better AI training
-                    processed_img_path = self.process_image_for_training(raw_img_path)
-                    
-                    extracted_images.append({
-                        'filename': img_filename,
-                        'raw_path': str(raw_img_path),
-                        'processed_path': str(processed_img_path),
-                        'page': page_num + 1,
-                        'type': 'embedded'
-                    })
+                    extracted_images.append(self.store_image(pix, img_filename, page_num, 'embedded'))
                 
                 pix = None
                 
             except Exception as e:
                 logger.warning(f"Could not extract image {img_index} from page {page_num + 1}: {e}")
         
-        # Method 2: Render entire page as image (for scanned PDFs)
-        page_pix = page.get_pixmap(matrix=fitz.Matrix(2, 2))  # 2x zoom for better quality
-        page_img_data = page_pix.tobytes("png")
+        # Method 2: Render entire page as image (for scanned PDFs), unless the
+        # embedded images already make up the drawing
+        if not self.always_render_page and image_list and self.image_coverage(page) > 0.8:
+            return extracted_images
         
+        page_pix = page.get_pixmap(matrix=fitz.Matrix(2, 2))  # 2x zoom for better quality
         page_img_filename = f'{pdf_stem}_page_{page_num+1}_full.png'
-        page_img_path = self.output_dir / 'images/raw' / page_img_filename
-        
-        with open(page_img_path, 'wb') as f:
-            f.write(page_img_data)
-        
-        # Process full page image
-        processed_page_path = self.process_image_for_training(page_img_path)
-        
-        extracted_images.append({
-            'filename': page_img_filename,
-            'raw_path': str(page_img_path),
-            'processed_path': str(processed_page_path),
-            'page': page_num + 1,
-            'type': 'full_page'
-        })
+        extracted_images.append(self.store_image(page_pix, page_img_filename, page_num, 'full_page'))
         
         page_pix = None
         
         return extracted_images
 
+    def store_image(self, pix, filename, page_num, image_type):
+        """Process a pixmap for training (and optionally keep the raw PNG), returning its record"""
+        raw_img_path = None
+        if self.save_raw:
+            raw_img_path = self.output_dir / 'images/raw' / filename
+            self.write_async(raw_img_path, pix.tobytes("png"))
+        
+        # Process image for better AI training, straight from the pixmap samples
+        processed_img_path = self.process_image_for_training(
+            self.pixmap_to_bgr(pix), self.output_dir / 'images/processed' / filename)
+        
+        return {
+            'filename': filename,
+            'raw_path': str(raw_img_path) if raw_img_path else None,
+            'processed_path': str(processed_img_path),
+            'page': page_num + 1,
+            'type': image_type
+        }
+
+    def image_coverage(self, page):
+        """Fraction of the page area covered by embedded image placements"""
+        page_area = page.rect.width * page.rect.height
+        if page_area <= 0:
+            return 0.0
+        covered = 0.0
+        for info in page.get_image_info():
+            bbox = fitz.Rect(info['bbox']) & page.rect
+            covered += bbox.width * bbox.height
+        return covered / page_area
+
     def extract_text_from_page(self, page, page_num):
-        """Extract text from page using multiple methods"""
-        text_data = {
-            'raw_text': '',
+        """Extract the embedded text of a page; OCR text is added later by ocr_images"""
+        raw_text = page.get_text().strip()
+        
+        return {
+            'raw_text': raw_text,
             'ocr_text': '',
-            'combined_text': ''
+            'combined_text': raw_text
         }
-        
-        # Method 1: Direct text extraction
-        raw_text = page.get_text()
-        text_data['raw_text'] = raw_text.strip()
-        
-        # Method 2: OCR if no text found or text is sparse
-        if len(raw_text.strip()) < 50:  # Likely scanned document
-            try:
-                pix = page.get_pixmap()
-                img_data = pix.tobytes("png")
-                img = Image.open(io.BytesIO(img_data))
-                
-                # Enhance image for better OCR
-                enhanced_img = self.enhance_image_for_ocr(img)
-                
-                ocr_text = pytesseract.image_to_string(enhanced_img)
-                text_data['ocr_text'] = ocr_text.strip()
-                
-                pix = None
-                
-            except Exception as e:
-                logger.warning(f"OCR failed for page {page_num + 1}: {e}")
-                text_data['ocr_text'] = ""
-        
-        # Combine texts
-        text_data['combined_text'] = f"{text_data['raw_text']}\n{text_data['ocr_text']}".strip()
-        
-        return text_data
 
-    def enhance_image_for_ocr(self, image):
-        """Enhance image quality for better OCR results"""
-        # Convert to grayscale
-        if image.mode != 'L':
-            image = image.convert('L')
-        
-        # Enhance contrast
-        enhancer = ImageEnhance.Contrast(image)
-        image = enhancer.enhance(2.0)
-        
-        # Enhance sharpness
-        enhancer = ImageEnhance.Sharpness(image)
-        image = enhancer.enhance(2.0)
-        
-        return image
+    def needs_ocr(self, page):
+        """A page needs OCR when it carries images but (almost) no searchable text"""
+        # Text-only / vector pages have nothing for OCR to find
+        if not page.get_images():
+            return False
+        blocks = page.get_text("blocks")
+        text_chars = sum(len(block[4].strip()) for block in blocks if block[6] == 0)
+        return text_chars < 50
 
-    def process_image_for_training(self, image_path):
-        """Process image for AI training dataset"""
-        image_path = Path(image_path)
-        processed_path = self.output_dir / 'images/processed' / image_path.name
-        
+    def render_page_for_ocr(self, page, page_num):
+        """Render a page and enhance it for OCR, or None if rendering fails"""
+        try:
+            # Render straight to grayscale; default 72 dpi is too coarse for OCR
+            pix = page.get_pixmap(dpi=150, colorspace=fitz.csGRAY, alpha=False)
+            gray = np.frombuffer(pix.samples, dtype=np.uint8).reshape(pix.height, pix.width)
+            
+            # Enhance image for better OCR
+            return Image.fromarray(self.enhance_image_for_ocr(gray))
+            
+        except Exception as e:
+            logger.warning(f"OCR failed for page {page_num + 1}: {e}")
+            return None
+
+    def flush_ocr_queue(self, ocr_queue):
+        """OCR the queued (page_text, image) pairs, fill in their text and empty the queue"""
+        if not ocr_queue:
+            return
+        ocr_texts = self.ocr_images([image for _, image in ocr_queue])
+        for (page_text, _), ocr_text in zip(ocr_queue, ocr_texts):
+            page_text['ocr_text'] = ocr_text
+            page_text['combined_text'] = f"{page_text['raw_text']}\n{ocr_text}".strip()
+        ocr_queue.clear()
+
+    def ocr_images(self, images):
+        """OCR a batch of page images, returning one text per image"""
         try:
-            # Load image
-            img = cv2.imread(str(image_path))
-            if img is None:
-                logger.warning(f"Could not load image: {image_path}")
-                return None
+            if TESSEROCR_AVAILABLE:
+                # Engine is loaded once per extractor; after that just feed it each page
+                if self.tess is None:
+                    self.tess = PyTessBaseAPI(oem=OEM.LSTM_ONLY, lang='eng')
+                texts = []
+                for image in images:
+                    self.tess.SetImage(image)
+                    texts.append(self.tess.GetUTF8Text())
+            else:
+                # One tesseract run over an image-list file instead of one process per page;
+                # tesseract separates the pages of its output with form feeds
+                with tempfile.TemporaryDirectory(prefix='ocr_') as tmp_dir:
+                    image_paths = []
+                    for i, image in enumerate(images):
+                        image_path = os.path.join(tmp_dir, f'page_{i}.png')
+                        image.save(image_path)
+                        image_paths.append(image_path)
+                    
+                    list_path = os.path.join(tmp_dir, 'list_of_images.txt')
+                    with open(list_path, 'w') as f:
+                        f.write('\n'.join(image_paths) + '\n')
+                    
+                    texts = pytesseract.image_to_string(list_path).split('\f')
+            
+            texts = [text.strip() for text in texts[:len(images)]]
+            return texts + [''] * (len(images) - len(texts))
             
+        except Exception as e:
+            logger.warning(f"OCR failed for {len(images)} page(s): {e}")
+            return [''] * len(images)
+
+    def enhance_image_for_ocr(self, gray):
+        """Enhance a grayscale page image for better OCR results"""
+        # Enhance contrast: stretch x2 around the mean gray level (saturating lookup table)
+        lut = np.clip(2 * np.arange(256) - round(gray.mean()), 0, 255).astype(np.uint8)
+        gray = cv2.LUT(gray, lut)
+        
+        # Enhance sharpness: 2*image - smoothed image, as a single convolution
+        return cv2.filter2D(gray, -1, self._ocr_sharpen_kernel)
+
+    def process_image_for_training(self, img, processed_path):
+        """Process an in-memory BGR image for the AI training dataset"""
+        try:
             # Preprocessing pipeline
             processed_img = self.preprocessing_pipeline(img)
             
             # Save processed image
-            cv2.imwrite(str(processed_path), processed_img)
+            cv2.imwrite(str(processed_path), processed_img, PNG_WRITE_PARAMS)
             
             return processed_path
             
         except Exception as e:
-            logger.error(f"Error processing image {image_path}: {e}")
+            logger.error(f"Error processing image {processed_path}: {e}")
             return None
 
     def preprocessing_pipeline(self, img):
         """Image preprocessing pipeline for electrical drawings"""
-        # Convert to LAB color space for better enhancement
-        lab = cv2.cvtColor(img, cv2.COLOR_BGR2LAB)
-        l, a, b = cv2.split(lab)
-        
-        # Apply CLAHE to L channel
-        clahe = cv2.createCLAHE(clipLimit=3.0, tileGridSize=(8,8))
-        l = clahe.apply(l)
+        # Drawings are essentially monochrome: work on a single gray channel throughout
+        gray = img if img.ndim == 2 else cv2.cvtColor(img, cv2.COLOR_BGR2GRAY)
         
-        # Merge and convert back
-        enhanced = cv2.merge([l, a, b])
-        enhanced = cv2.cvtColor(enhanced, cv2.COLOR_LAB2BGR)
+        # Apply CLAHE for local contrast
+        enhanced = self._clahe.apply(gray)
         
-        # Noise reduction
-        denoised = cv2.fastNlMeansDenoisingColored(enhanced, None, 10, 10, 7, 21)
+        # Line art (mostly white page) needs no denoising; darker, noisier scans still get non-local means
+        if gray.mean() < 200:
+            enhanced = cv2.fastNlMeansDenoising(enhanced, None, 10, 7, 21)
         
         # Sharpen the image
-        kernel = np.array([[-1,-1,-1], [-1,9,-1], [-1,-1,-1]])
-        sharpened = cv2.filter2D(denoised, -1, kernel)
+        sharpened = cv2.filter2D(enhanced, -1, self._sharpen_kernel)
         
         return sharpened
 
     def detect_electrical_keywords(self, text_data):
         """Detect electrical components mentioned in text"""
-        electrical_patterns = {
-            'switch': [
-                r'\bswitch\b', r'\bsw\b', r'\btoggle\b', r'\binterruptor\b'
-            ],
-            'outlet': [
-                r'\boutlet\b', r'\bsocket\b', r'\breceptacle\b', r'\bplug\b'
-            ],
-            'light': [
-                r'\blight\b', r'\blamp\b', r'\bfixture\b', r'\bluminaire\b',
-                r'\bceiling\s+light\b', r'\brecessed\b'
-            ],
-            'panel': [
-                r'\bpanel\b', r'\belectrical\s+panel\b', r'\bdistribution\b',
-                r'\bbreaker\s+panel\b', r'\bmain\s+panel\b'
-            ],
-            'wire': [
-                r'\bwire\b', r'\bcable\b', r'\bconductor\b', r'\bconduit\b'
-            ],
-            'voltage': [
-                r'\b\d+\s*v\b', r'\b\d+\s*volt\b', r'\b110v\b', r'\b220v\b', r'\b240v\b'
-            ],
-            'amperage': [
-                r'\b\d+\s*a\b', r'\b\d+\s*amp\b', r'\bampere\b'
-            ],
-            'power': [
-                r'\b\d+\s*w\b', r'\b\d+\s*watt\b', r'\bkw\b', r'\bkilowatt\b'
-            ]
-        }
-        
-        combined_text = text_data.get('combined_text', '').lower()
+        combined_text = text_data.get('combined_text', '')
+        # Fold once (diacritics stripped, lowercased) so no case-insensitive matching is needed;
+        # the fold keeps the length, so spans index the original text directly
+        folded_text = combined_text.translate(_ASCII_FOLD)
         detected_components = []
         
-        for component_type, patterns in electrical_patterns.items():
-            for pattern in patterns:
-                import re
-                matches = re.finditer(pattern, combined_text, re.IGNORECASE)
-                for match in matches:
-                    detected_components.append({
-                        'type': component_type,
-                        'text': match.group(),
-                        'position': match.span(),
-                        'confidence': 0.8  # Basic confidence score
-                    })
+        # Single pass over the text; the named group that matched is the component type
+        for match in self.ELECTRICAL_RE.finditer(folded_text):
+            detected_components.append({
+                'type': match.lastgroup,
+                'text': combined_text[match.start():match.end()],
+                'position': match.span(),
+                'confidence': 0.8  # Basic confidence score
+            })
         
         return detected_components
 
+    def link_or_copy(self, src, dest):
+        """Hardlink src to dest (no data copy), copying only across filesystems"""
+        # Replace whatever a previous run left behind, possibly a link to src itself
+        try:
+            os.unlink(dest)
+        except FileNotFoundError:
+            pass
+        try:
+            os.link(src, dest)
+        except OSError:
+            shutil.copy2(src, dest)
+
     def prepare_training_dataset(self, train_split=0.8):
         """Prepare dataset for YOLO training"""
         logger.info("Preparing training dataset...")
         
-        processed_images = list((self.output_dir / 'images/processed').glob('*.png'))
+        processed_dir = str(self.output_dir / 'images/processed')
+        with os.scandir(processed_dir) as entries:
+            processed_images = [entry.name for entry in entries if entry.name.endswith('.png')]
         
         if not processed_images:
             logger.warning("No processed images found for dataset preparation")
             return
         
-        # Split into train and validation
-        np.random.shuffle(processed_images)
-        split_idx = int(len(processed_images) * train_split)
-        
-        train_images = processed_images[:split_idx]
-        val_images = processed_images[split_idx:]
-        
-        # Copy to dataset directories
-        for img_path in train_images:
-            dest_path = self.output_dir / 'dataset/train/images' / img_path.name
-            shutil.copy2(img_path, dest_path)
-            
-            # Create empty label file
-            label_path = self.output_dir / 'dataset/train/labels' / f'{img_path.stem}.txt'
-            label_path.touch()
-        
-        for img_path in val_images:
-            dest_path = self.output_dir / 'dataset/val/images' / img_path.name
-            shutil.copy2(img_path, dest_path)
-            
-            # Create empty label file
-            label_path = self.output_dir / 'dataset/val/labels' / f'{img_path.stem}.txt'
-            label_path.touch()
+        # Split into train and validation by shuffling indices, not the name list
+        indices = np.arange(len(processed_images))
+        np.random.shuffle(indices)
+        split_idx = int(len(indices) * train_split)
+        splits = {'train': indices[:split_idx], 'val': indices[split_idx:]}
+        
+        # Link into dataset directories
+        for split, split_indices in splits.items():
+            images_dir = str(self.output_dir / 'dataset' / split / 'images')
+            labels_dir = str(self.output_dir / 'dataset' / split / 'labels')
+            for i in split_indices:
+                name = processed_images[i]
+                self.link_or_copy(os.path.join(processed_dir, name), os.path.join(images_dir, name))
+                
+                # Create empty label file
+                label_path = os.path.join(labels_dir, f'{os.path.splitext(name)[0]}.txt')
+                open(label_path, 'a').close()
         
-        logger.info(f"Dataset prepared: {len(train_images)} training, {len(val_images)} validation images")
+        logger.info(f"Dataset prepared: {len(splits['train'])} training, {len(splits['val'])} validation images")
 
     def process_directory(self):
         """Process all PDFs in the input directory"""
@@ -352,8 +513,17 @@ class PDFDataExtractor:
         
         logger.info(f"Found {len(pdf_files)} PDF files to process")
         
-        for pdf_file in tqdm(pdf_files, desc="Processing PDFs"):
-            self.extract_pdf_data(pdf_file)
+        # PDFs are independent, so spread them over all cores
+        with ProcessPoolExecutor(max_workers=min(os.cpu_count() or 1, len(pdf_files)),
+                                 initializer=PDFDataExtractor._init_worker,
+                                 initargs=(str(self.input_dir), str(self.output_dir),
+                                           self.always_render_page, self.save_raw)) as executor:
+            results = list(tqdm(executor.map(PDFDataExtractor._extract_one, pdf_files),
+                                total=len(pdf_files), desc="Processing PDFs"))
+        
+        failed = results.count(False)
+        if failed:
+            logger.warning(f"{failed} of {len(pdf_files)} PDFs failed to process")
         
         # Prepare training dataset
         self.prepare_training_dataset()
@@ -366,11 +536,16 @@ def main():
     parser.add_argument('output_dir', help='Output directory for extracted data')
     parser.add_argument('--train-split', type=float, default=0.8, 
                        help='Train/validation split ratio (default: 0.8)')
+    parser.add_argument('--always-render-page', action='store_true',
+                       help='Render full pages even when embedded images cover them')
+    parser.add_argument('--save-raw', action='store_true',
+                       help='Also keep the unprocessed images under images/raw')
     
     args = parser.parse_args()
     
-    extractor = PDFDataExtractor(args.input_dir, args.output_dir)
-    extractor.process_directory()
+    with PDFDataExtractor(args.input_dir, args.output_dir, args.always_render_page,
+                          args.save_raw) as extractor:
+        extractor.process_directory()
 
 if __name__ == "__main__":
     # For direct execution with default paths
@@ -383,7 +558,7 @@ if __name__ == "__main__":
             input_dir = "../backend/uploads"
             output_dir = "extracted_data"
         
-        extractor = PDFDataExtractor(input_dir, output_dir)
-        extractor.process_directory()
+        with PDFDataExtractor(input_dir, output_dir) as extractor:
+            extractor.process_directory()
     else:
         main()
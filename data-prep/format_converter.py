@@ -15,21 +15,178 @@ import logging
 from tqdm import tqdm
 import subprocess
 import shutil
+import zlib
+from concurrent.futures import ProcessPoolExecutor
+from itertools import chain, islice
 import ezdxf
-from ezdxf.addons.drawing import matplotlib, RenderContext
-import matplotlib.pyplot as plt
+from ezdxf.addons import acadctb
+from ezdxf.filemanagement import find_support_file
+import matplotlib
+matplotlib.use('Agg')  # headless rendering; no GUI backend negotiation in worker processes
+from ezdxf.addons.drawing import matplotlib, Frontend, RenderContext, config, layout
 from matplotlib.backends.backend_agg import FigureCanvasAgg
+from matplotlib.figure import Figure
+from matplotlib.collections import LineCollection
 import xml.etree.ElementTree as ET
 
 # Setup logging
 logging.basicConfig(level=logging.INFO)
 logger = logging.getLogger(__name__)
 
+# ezdxf's PyMuPDF backend rasterizes vectors directly, without matplotlib's artist tree
+try:
+    from ezdxf.addons.drawing import pymupdf
+    MUPDF_AVAILABLE = True
+except ImportError:
+    MUPDF_AVAILABLE = False
+
+# ezdxf's Qt backend is imported only on request: importing it picks (and prints) a Qt binding
+pyqt = QtCore = QtGui = QtWidgets = None
+
+def import_qt_backend():
+    """Import ezdxf's Qt drawing backend and its Qt modules; raises ImportError without a binding"""
+    global pyqt, QtCore, QtGui, QtWidgets
+    if pyqt is None:
+        os.environ.setdefault('QT_QPA_PLATFORM', 'offscreen')  # no display needed for QImage rendering
+        from ezdxf.addons.xqt import QtCore, QtGui, QtWidgets
+        from ezdxf.addons.drawing import pyqt
+
+# orjson parses COCO files in C, several times faster than the stdlib decoder
+try:
+    import orjson
+    ORJSON_AVAILABLE = True
+except ImportError:
+    ORJSON_AVAILABLE = False
+
+# ijson streams large COCO files instead of building the whole document in memory
+try:
+    import ijson
+    IJSON_AVAILABLE = True
+except ImportError:
+    IJSON_AVAILABLE = False
+
+# Raster output: a 20x16 in page at 300 dpi, drawn black-on-white
+RENDER_PAGE = layout.Page(20 * 25.4, 16 * 25.4, layout.Units.mm)
+RENDER_DPI = 300
+PNG_WRITE_PARAMS = [cv2.IMWRITE_PNG_COMPRESSION, 1]
+YOLO_LINE_FORMAT = '%d %.6f %.6f %.6f %.6f'
+RENDER_CONFIG = config.Configuration(background_policy=config.BackgroundPolicy.WHITE)
+# Qt draws cosmetic pens sized for 72 dpi; scale lineweights up to the raster resolution
+QT_RENDER_CONFIG = RENDER_CONFIG.with_changes(lineweight_scaling=RENDER_DPI / 72)
+
+# COCO files above this size are streamed in annotation batches of COCO_STREAM_BATCH
+COCO_STREAM_THRESHOLD = 256 * 1024 * 1024
+COCO_STREAM_BATCH = 10_000
+
+class LineCollectionBackend(matplotlib.MatplotlibBackend):
+    """MatplotlibBackend that batches lines and line paths into one LineCollection per layout"""
+    
+    def __init__(self, ax, **kwargs):
+        super().__init__(ax, **kwargs)
+        self._segments = []
+        self._linewidths = []
+        self._colors = []
+    
+    def _add_segments(self, segments, properties):
+        """Queue segments to be drawn with the given line properties"""
+        self._segments.extend(segments)
+        self._linewidths.extend([self.get_lineweight(properties)] * len(segments))
+        self._colors.extend([properties.color] * len(segments))
+    
+    def draw_line(self, start, end, properties):
+        if start.isclose(end):
+            # matplotlib draws nothing for a zero-length line
+            self.draw_point(start, properties)
+        else:
+            self._add_segments([((start.x, start.y), (end.x, end.y))], properties)
+    
+    def draw_path(self, path, properties):
+        # Flatten curves so every path becomes plain segments in the shared collection
+        for sub_path in path.sub_paths():
+            vertices = [(v.x, v.y) for v in sub_path.flattening(self.config.max_flattening_distance)]
+            self._add_segments(list(zip(vertices, vertices[1:])), properties)
+    
+    def finalize(self):
+        # One artist instead of one Line2D/PathPatch per entity
+        if self._segments:
+            self.ax.add_collection(LineCollection(
+                self._segments, linewidths=self._linewidths, colors=self._colors,
+                capstyle='butt', zorder=self._get_z()
+            ))
+            self._segments, self._linewidths, self._colors = [], [], []
+        super().finalize()
+
+# Class name to YOLO class ID for annotation conversion (unknown names map to 0)
+_CLASS_MAPPING = {
+    'switch': 0,
+    'outlet': 1,
+    'light': 2,
+    'panel': 3,
+    'wire': 4,
+    'junction': 5,
+    'breaker': 6,
+    'ground': 7,
+    'measurement': 8,
+    'motor': 9,
+    'transformer': 10,
+    'sensor': 11
+}
+
+# Per-process converter used by the process_cad_files worker pool
+_worker_converter = None
+
 class FormatConverter:
-    def __init__(self, input_dir, output_dir):
+    def __init__(self, input_dir, output_dir, backend='mupdf', link_mode='hardlink', denoise='gaussian',
+                 save_intermediate=False):
         self.input_dir = Path(input_dir)
         self.output_dir = Path(output_dir)
+        self.link_mode = link_mode
+        self.denoise = denoise
+        self.save_intermediate = save_intermediate
+        # Post-processing state reused across images; buffers are sized on first use
+        self._clahe = cv2.createCLAHE(clipLimit=2.0, tileGridSize=(8,8))
+        self._close_kernel = cv2.getStructuringElement(cv2.MORPH_RECT, (3,3))
+        self._post_shape = None
+        # Run the filter chain through OpenCV's OpenCL (T-API) kernels when a device is present
+        self.use_opencl = cv2.ocl.haveOpenCL()
+        if self.use_opencl:
+            cv2.ocl.setUseOpenCL(True)
+        # Plot style tables by CTB file name; building one costs more than the rest of RenderContext
+        self._ctb_cache = {}
+        if backend == 'qt':
+            try:
+                import_qt_backend()
+                # QGraphicsScene needs one QApplication per process
+                self._qt_app = QtWidgets.QApplication.instance() or QtWidgets.QApplication([])
+            except ImportError:
+                logger.warning("Qt drawing backend not available (needs PySide6 or PyQt5), falling back to matplotlib")
+                backend = 'matplotlib'
+        if backend == 'mupdf' and not MUPDF_AVAILABLE:
+            logger.warning("PyMuPDF drawing backend not available, falling back to matplotlib")
+            backend = 'matplotlib'
+        self.backend = backend
+        if backend == 'matplotlib':
+            # One Agg figure reused for every drawing instead of a pyplot figure per file
+            self._fig = Figure(figsize=(20, 16), dpi=RENDER_DPI)
+            self._canvas = FigureCanvasAgg(self._fig)
+            self._ax = self._fig.add_subplot(111)
+            # Axes fill the whole canvas so the pixel buffer needs no tight-bbox crop
+            self._fig.subplots_adjust(left=0, right=1, bottom=0, top=1)
         self.setup_directories()
+    
+    @staticmethod
+    def _init_worker(input_dir, output_dir, backend, denoise, save_intermediate, cv_threads):
+        """Pool initializer: one converter per worker process"""
+        global _worker_converter
+        # Share the cores between workers instead of every worker starting a full OpenCV thread pool
+        cv2.setNumThreads(cv_threads)
+        _worker_converter = FormatConverter(input_dir, output_dir, backend, denoise=denoise,
+                                            save_intermediate=save_intermediate)
+    
+    @staticmethod
+    def _convert_one(task):
+        """Convert one (cad_path, file_type, dxf_path) task in a worker"""
+        return _worker_converter.convert_cad_file(*task)
         
     def setup_directories(self):
         """Create output directory structure"""
@@ -94,6 +251,41 @@ class FormatConverter:
         logger.error(f"Could not convert {dwg_path.name} to DXF")
         return None
 
+    def convert_all_dwg_to_dxf(self, dwg_paths):
+        """Convert DWG files to DXF with one ODA File Converter run per source directory"""
+        temp_dir = self.output_dir / 'temp'
+        temp_dir.mkdir(exist_ok=True)
+        
+        dwg_by_dir = {}
+        for dwg_path in dwg_paths:
+            dwg_by_dir.setdefault(Path(dwg_path).parent, []).append(Path(dwg_path))
+        
+        dxf_paths = {}
+        for source_dir, dir_dwg_paths in dwg_by_dir.items():
+            expected = {dwg_path.stem: temp_dir / f'{dwg_path.stem}.dxf' for dwg_path in dir_dwg_paths}
+            # Drop leftovers from an earlier run so only fresh conversions count
+            for dxf_path in expected.values():
+                dxf_path.unlink(missing_ok=True)
+            
+            try:
+                cmd = [
+                    'ODAFileConverter',
+                    str(source_dir),
+                    str(temp_dir),
+                    'ACAD2018', 'DXF', '0', '1',
+                    '*.dwg'
+                ]
+                subprocess.run(cmd, capture_output=True, text=True, timeout=30 * len(dir_dwg_paths))
+            except (subprocess.TimeoutExpired, FileNotFoundError):
+                logger.warning("ODA File Converter not available or timed out, converting DWG files one by one")
+                continue
+            
+            converted = {stem: dxf_path for stem, dxf_path in expected.items() if dxf_path.exists()}
+            logger.info(f"Converted {len(converted)} of {len(dir_dwg_paths)} DWG files in {source_dir} to DXF")
+            dxf_paths.update(converted)
+        
+        return dxf_paths
+
     def convert_dxf_to_image(self, dxf_path, output_type='dxf'):
         """Convert DXF file to high-quality image"""
         dxf_path = Path(dxf_path)
@@ -103,40 +295,26 @@ class FormatConverter:
             doc = ezdxf.readfile(dxf_path)
             msp = doc.modelspace()
             
-            # Create matplotlib figure
-            fig = plt.figure(figsize=(20, 16), dpi=150)
-            ax = fig.add_subplot(111)
-            
-            # Create render context
-            ctx = RenderContext(doc)
-            
-            # Render to matplotlib
-            out = matplotlib.MatplotlibBackend(ax)
-            matplotlib.Frontend(ctx, out).draw_layout(msp, finalize=True)
-            
-            # Set background to white
-            ax.set_facecolor('white')
-            fig.patch.set_facecolor('white')
+            # Create render context, reusing the layout's already-loaded plot style table
+            ctx = RenderContext(doc, ctb=self.plot_style_table(msp))
             
-            # Remove axes for cleaner image
-            ax.set_xticks([])
-            ax.set_yticks([])
-            ax.axis('off')
-            
-            # Save high-quality image
-            if output_type == 'dwg':
-                img_path = self.output_dir / 'images/dwg_converted' / f'{dxf_path.stem}.png'
+            # Render high-quality image; pixels stay in memory for post-processing
+            if self.backend == 'mupdf':
+                img = self.render_with_mupdf(ctx, msp)
+            elif self.backend == 'qt':
+                img = self.render_with_qt(ctx, msp)
             else:
-                img_path = self.output_dir / 'images/dxf_converted' / f'{dxf_path.stem}.png'
+                img = self.render_with_matplotlib(ctx, msp)
             
-            plt.savefig(img_path, dpi=300, bbox_inches='tight', 
-                       facecolor='white', edgecolor='none')
-            plt.close()
+            # Keep the raw render only on request
+            if self.save_intermediate:
+                img_path = self.output_dir / f'images/{output_type}_converted' / f'{dxf_path.stem}.png'
+                cv2.imwrite(str(img_path), img, PNG_WRITE_PARAMS)
             
             logger.info(f"Successfully converted {dxf_path.name} to image")
             
             # Post-process image for better AI training
-            processed_path = self.post_process_cad_image(img_path)
+            processed_path = self.post_process_cad_image(img, dxf_path.stem)
             
             return processed_path
             
@@ -144,104 +322,208 @@ class FormatConverter:
             logger.error(f"Error converting {dxf_path.name} to image: {e}")
             return None
 
-    def post_process_cad_image(self, img_path):
-        """Post-process CAD image for better AI training"""
-        img_path = Path(img_path)
-        processed_path = self.output_dir / 'images/processed' / img_path.name
+    def plot_style_table(self, layout):
+        """Plot style table (CTB) for a layout, loaded once per file name as RenderContext would"""
+        ctb_name = layout.get_plot_style_filename()
+        if ctb_name not in self._ctb_cache:
+            try:
+                self._ctb_cache[ctb_name] = acadctb.load(find_support_file(ctb_name, ezdxf.options.support_dirs))
+            except IOError:
+                self._ctb_cache[ctb_name] = acadctb.new_ctb()
+        return self._ctb_cache[ctb_name]
+
+    def render_with_mupdf(self, ctx, msp):
+        """Rasterize a layout with ezdxf's PyMuPDF backend and return it as a BGR array"""
+        backend = pymupdf.PyMuPdfBackend()
+        Frontend(ctx, backend, config=RENDER_CONFIG).draw_layout(msp, finalize=True)
+        
+        # Read the RGB samples straight out of the pixmap, no image codec involved
+        pixmap = backend.get_replay(RENDER_PAGE).get_pixmap(dpi=RENDER_DPI)
+        rgb = np.frombuffer(pixmap.samples_mv, dtype=np.uint8).reshape(pixmap.height, pixmap.width, pixmap.n)
+        
+        return cv2.cvtColor(rgb, cv2.COLOR_RGB2BGR)
+
+    def render_with_qt(self, ctx, msp):
+        """Rasterize a layout through a Qt scene onto a QImage and return it as a BGR array"""
+        scene = QtWidgets.QGraphicsScene()
+        Frontend(ctx, pyqt.PyQtBackend(scene), config=QT_RENDER_CONFIG).draw_layout(msp, finalize=True)
+        
+        width = round(RENDER_PAGE.width_in_mm / 25.4 * RENDER_DPI)
+        height = round(RENDER_PAGE.height_in_mm / 25.4 * RENDER_DPI)
+        image = QtGui.QImage(width, height, QtGui.QImage.Format.Format_RGB888)
+        image.fill(QtGui.QColor('white'))
+        
+        painter = QtGui.QPainter(image)
+        painter.setRenderHint(QtGui.QPainter.RenderHint.Antialiasing)
+        # Flip so that +y is up, as ezdxf's Qt viewer does
+        painter.translate(0, height)
+        painter.scale(1, -1)
+        scene.render(painter, QtCore.QRectF(0, 0, width, height), scene.sceneRect(),
+                     QtCore.Qt.AspectRatioMode.KeepAspectRatio)
+        painter.end()
+        
+        # PySide6 hands back a sized memoryview; PyQt5 a sip.voidptr that has to be given its size
+        bits = image.constBits()
+        if hasattr(bits, 'setsize'):
+            bits.setsize(image.sizeInBytes())
+        
+        # QImage rows are padded to 4 bytes; drop the padding while converting RGB to BGR
+        rgb = np.frombuffer(bits, dtype=np.uint8).reshape(height, image.bytesPerLine())
+        return cv2.cvtColor(rgb[:, :width * 3].reshape(height, width, 3), cv2.COLOR_RGB2BGR)
+
+    def render_with_matplotlib(self, ctx, msp):
+        """Rasterize a layout through matplotlib and return it as a BGR array"""
+        # Reset the shared figure; the backend resizes it to the drawing's aspect ratio
+        fig, ax = self._fig, self._ax
+        ax.clear()
+        fig.set_size_inches(20, 16)
+        
+        # Render to matplotlib
+        out = LineCollectionBackend(ax)
+        Frontend(ctx, out, config=RENDER_CONFIG).draw_layout(msp, finalize=True)
+        
+        # Set background to white
+        ax.set_facecolor('white')
+        fig.patch.set_facecolor('white')
+        
+        # Remove axes for cleaner image
+        ax.set_xticks([])
+        ax.set_yticks([])
+        ax.axis('off')
+        
+        # Take the pixels straight from the Agg buffer instead of a savefig/imread round trip
+        self._canvas.draw()
+        return cv2.cvtColor(np.asarray(self._canvas.buffer_rgba()), cv2.COLOR_RGBA2BGR)
+
+    def post_process_cad_image(self, img, stem):
+        """Post-process a rendered BGR CAD image for better AI training and save it as <stem>.png"""
+        processed_path = self.output_dir / 'images/processed' / f'{stem}.png'
         
         try:
-            # Load image
-            img = cv2.imread(str(img_path))
-            if img is None:
-                return None
+            gray, filtered, enhanced = self.post_buffers(img.shape[:2])
             
             # Convert to grayscale for processing
-            gray = cv2.cvtColor(img, cv2.COLOR_BGR2GRAY)
+            cv2.cvtColor(img, cv2.COLOR_BGR2GRAY, dst=gray)
             
-            # Apply bilateral filter to reduce noise while preserving edges
-            filtered = cv2.bilateralFilter(gray, 9, 75, 75)
-            
-            # Enhance contrast using CLAHE
-            clahe = cv2.createCLAHE(clipLimit=2.0, tileGridSize=(8,8))
-            enhanced = clahe.apply(filtered)
-            
-            # Apply morphological operations to clean up lines
-            kernel = cv2.getStructuringElement(cv2.MORPH_RECT, (3,3))
-            cleaned = cv2.morphologyEx(enhanced, cv2.MORPH_CLOSE, kernel)
-            
-            # Convert back to BGR for consistency
-            final_img = cv2.cvtColor(cleaned, cv2.COLOR_GRAY2BGR)
+            if self.use_opencl:
+                # One upload, the whole chain on the device, one download
+                cleaned = self.enhance_lines(cv2.UMat(gray)).get()
+            else:
+                # gray is free again by the closing step, so it takes the result
+                cleaned = self.enhance_lines(gray, filtered, enhanced, gray)
             
-            # Save processed image
-            cv2.imwrite(str(processed_path), final_img)
+            # Save processed image as single-channel PNG; loaders expand it to BGR on read
+            cv2.imwrite(str(processed_path), cleaned, PNG_WRITE_PARAMS)
             
             return processed_path
             
         except Exception as e:
-            logger.error(f"Error post-processing {img_path}: {e}")
+            logger.error(f"Error post-processing {stem}: {e}")
             return None
 
+    def enhance_lines(self, gray, filtered=None, enhanced=None, cleaned=None):
+        """Denoise, contrast-enhance and close a grayscale image (ndarray with optional dst buffers, or UMat)"""
+        # Reduce noise; CAD linework has no soft gradients, so a separable blur does the job
+        if self.denoise == 'gaussian':
+            filtered = cv2.GaussianBlur(gray, (5,5), 0, dst=filtered)
+        elif self.denoise == 'median':
+            filtered = cv2.medianBlur(gray, 3, dst=filtered)
+        else:
+            # Edge-preserving bilateral filter (much slower)
+            filtered = cv2.bilateralFilter(gray, 9, 75, 75, dst=filtered)
+        
+        # Enhance contrast using CLAHE
+        enhanced = self._clahe.apply(filtered, enhanced)
+        
+        # Apply morphological operations to clean up lines
+        return cv2.morphologyEx(enhanced, cv2.MORPH_CLOSE, self._close_kernel, dst=cleaned)
+
+    def post_buffers(self, shape):
+        """Grayscale work buffers for post-processing, reallocated only when the image size changes"""
+        if self._post_shape != shape:
+            self._post_buffers = tuple(np.empty(shape, dtype=np.uint8) for _ in range(3))
+            self._post_shape = shape
+        return self._post_buffers
+
     def convert_coco_to_yolo(self, coco_json_path, images_dir):
         """Convert COCO format annotations to YOLO format"""
         coco_json_path = Path(coco_json_path)
         images_dir = Path(images_dir)
         
         try:
-            with open(coco_json_path, 'r') as f:
-                coco_data = json.load(f)
+            images, ann_images, ann_classes, bboxes = self.read_coco_annotations(coco_json_path)
             
-            # Create category mapping
-            categories = {cat['id']: cat['name'] for cat in coco_data['categories']}
+            # Order rows by image (stable keeps annotation order)
+            order = np.argsort(ann_images, kind='stable')
+            ann_images, bboxes, ann_classes = ann_images[order], bboxes[order], ann_classes[order]
             
-            # Group annotations by image
-            image_annotations = {}
-            for ann in coco_data['annotations']:
-                img_id = ann['image_id']
-                if img_id not in image_annotations:
-                    image_annotations[img_id] = []
-                image_annotations[img_id].append(ann)
+            # Convert COCO (x, y, w, h) boxes to normalized YOLO centers/sizes in one pass
+            img_sizes = np.array([[img_info['width'], img_info['height']] for img_info in images],
+                                 dtype=np.float64).reshape(-1, 2)[ann_images]
+            centers = (bboxes[:, :2] + bboxes[:, 2:] / 2) / img_sizes
+            sizes = bboxes[:, 2:] / img_sizes
             
-            # Convert each image's annotations
-            for img_info in coco_data['images']:
-                img_id = img_info['id']
-                img_width = img_info['width']
-                img_height = img_info['height']
-                img_filename = img_info['file_name']
-                
-                # Create YOLO label file
-                yolo_filename = Path(img_filename).stem + '.txt'
+            yolo_rows = np.column_stack((ann_classes, centers, sizes))
+            
+            # Write one YOLO label file per image from its slice of the sorted rows
+            bounds = np.searchsorted(ann_images, np.arange(len(images) + 1))
+            for i, img_info in enumerate(images):
+                yolo_filename = Path(img_info['file_name']).stem + '.txt'
                 yolo_path = self.output_dir / 'annotations/yolo' / yolo_filename
-                
-                yolo_annotations = []
-                
-                if img_id in image_annotations:
-                    for ann in image_annotations[img_id]:
-                        # Convert COCO bbox to YOLO format
-                        x, y, w, h = ann['bbox']
-                        
-                        # Normalize coordinates
-                        x_center = (x + w/2) / img_width
-                        y_center = (y + h/2) / img_height
-                        norm_width = w / img_width
-                        norm_height = h / img_height
-                        
-                        # Get class ID (assuming categories are mapped to indices)
-                        class_name = categories[ann['category_id']]
-                        class_id = self.get_class_id(class_name)
-                        
-                        yolo_annotations.append(
-                            f"{class_id} {x_center:.6f} {y_center:.6f} {norm_width:.6f} {norm_height:.6f}"
-                        )
-                
-                # Write YOLO annotation file
-                with open(yolo_path, 'w') as f:
-                    f.write('\n'.join(yolo_annotations))
+                self.write_yolo_labels(yolo_path, yolo_rows[bounds[i]:bounds[i + 1]].tolist())
             
             logger.info(f"Successfully converted COCO annotations to YOLO format")
             
         except Exception as e:
             logger.error(f"Error converting COCO to YOLO: {e}")
 
+    def write_yolo_labels(self, yolo_path, rows):
+        """Write (class, x_center, y_center, width, height) rows as a YOLO label file; no file without rows"""
+        if len(rows) == 0:
+            # A missing label file already means "no objects" to YOLO
+            Path(yolo_path).unlink(missing_ok=True)
+            return
+        # One C-level %-format over the whole file instead of formatting row by row
+        with open(yolo_path, 'w') as f:
+            f.write('\n'.join([YOLO_LINE_FORMAT] * len(rows)) % tuple(chain.from_iterable(rows)))
+
+    def read_coco_annotations(self, coco_json_path):
+        """Read COCO images plus per-annotation image index, class ID and bbox arrays"""
+        if IJSON_AVAILABLE and coco_json_path.stat().st_size > COCO_STREAM_THRESHOLD:
+            # Categories and images are small; annotations stream through in batches
+            with open(coco_json_path, 'rb') as f:
+                categories = list(ijson.items(f, 'categories.item'))
+                f.seek(0)
+                images = list(ijson.items(f, 'images.item', use_float=True))
+                f.seek(0)
+                annotations = ijson.items(f, 'annotations.item', use_float=True)
+                class_ids = {cat['id']: self.get_class_id(cat['name']) for cat in categories}
+                image_index = {img_info['id']: i for i, img_info in enumerate(images)}
+                batches = [self.coco_annotation_arrays(batch, image_index, class_ids)
+                           for batch in iter(lambda: list(islice(annotations, COCO_STREAM_BATCH)), [])]
+            if not batches:
+                batches = [self.coco_annotation_arrays([], image_index, class_ids)]
+            return (images,) + tuple(np.concatenate(column) for column in zip(*batches))
+        
+        if ORJSON_AVAILABLE:
+            coco_data = orjson.loads(coco_json_path.read_bytes())
+        else:
+            with open(coco_json_path, 'r') as f:
+                coco_data = json.load(f)
+        
+        images = coco_data['images']
+        class_ids = {cat['id']: self.get_class_id(cat['name']) for cat in coco_data['categories']}
+        image_index = {img_info['id']: i for i, img_info in enumerate(images)}
+        return (images,) + self.coco_annotation_arrays(coco_data['annotations'], image_index, class_ids)
+
+    def coco_annotation_arrays(self, annotations, image_index, class_ids):
+        """Pack COCO annotations into image index, class ID and bbox arrays, skipping unknown images"""
+        annotations = [ann for ann in annotations if ann['image_id'] in image_index]
+        ann_images = np.array([image_index[ann['image_id']] for ann in annotations], dtype=np.intp)
+        ann_classes = np.array([class_ids[ann['category_id']] for ann in annotations], dtype=np.int64)
+        bboxes = np.array([ann['bbox'] for ann in annotations], dtype=np.float64).reshape(-1, 4)
+        return ann_images, ann_classes, bboxes
+
     def convert_voc_to_yolo(self, voc_dir):
         """Convert Pascal VOC format annotations to YOLO format"""
         voc_dir = Path(voc_dir)
@@ -252,6 +534,9 @@ class FormatConverter:
             return
         
         try:
+            # Class IDs by raw name, so each distinct name is lowercased and looked up once
+            class_ids = {}
+            
             for xml_file in annotations_dir.glob('*.xml'):
                 tree = ET.parse(xml_file)
                 root = tree.getroot()
@@ -261,12 +546,14 @@ class FormatConverter:
                 img_width = int(size.find('width').text)
                 img_height = int(size.find('height').text)
                 
-                yolo_annotations = []
+                yolo_rows = []
                 
                 # Process each object
                 for obj in root.findall('object'):
                     class_name = obj.find('name').text
-                    class_id = self.get_class_id(class_name)
+                    class_id = class_ids.get(class_name)
+                    if class_id is None:
+                        class_id = class_ids[class_name] = self.get_class_id(class_name)
                     
                     bbox = obj.find('bndbox')
                     xmin = int(bbox.find('xmin').text)
@@ -280,16 +567,12 @@ class FormatConverter:
                     width = (xmax - xmin) / img_width
                     height = (ymax - ymin) / img_height
                     
-                    yolo_annotations.append(
-                        f"{class_id} {x_center:.6f} {y_center:.6f} {width:.6f} {height:.6f}"
-                    )
+                    yolo_rows.append((class_id, x_center, y_center, width, height))
                 
                 # Write YOLO annotation file
                 yolo_filename = xml_file.stem + '.txt'
                 yolo_path = self.output_dir / 'annotations/yolo' / yolo_filename
-                
-                with open(yolo_path, 'w') as f:
-                    f.write('\n'.join(yolo_annotations))
+                self.write_yolo_labels(yolo_path, yolo_rows)
             
             logger.info("Successfully converted VOC annotations to YOLO format")
             
@@ -298,54 +581,82 @@ class FormatConverter:
 
     def get_class_id(self, class_name):
         """Map class name to ID for YOLO format"""
-        class_mapping = {
-            'switch': 0,
-            'outlet': 1, 
-            'light': 2,
-            'panel': 3,
-            'wire': 4,
-            'junction': 5,
-            'breaker': 6,
-            'ground': 7,
-            'measurement': 8,
-            'motor': 9,
-            'transformer': 10,
-            'sensor': 11
-        }
-        
-        return class_mapping.get(class_name.lower(), 0)
+        return _CLASS_MAPPING.get(class_name.lower(), 0)
+
+    def convert_cad_file(self, cad_path, file_type, dxf_path=None):
+        """Convert one DXF or DWG file to a processed image (dxf_path: DWG already converted to DXF)"""
+        if file_type == 'dxf':
+            return self.convert_dxf_to_image(cad_path, 'dxf')
+        
+        # Convert DWG to DXF (unless the batch run already did) then to image
+        if dxf_path is None:
+            dxf_path = self.convert_dwg_to_dxf(cad_path)
+        if not dxf_path:
+            return None
+        img_path = self.convert_dxf_to_image(dxf_path, 'dwg')
+        # Clean up temporary DXF
+        dxf_path.unlink(missing_ok=True)
+        return img_path
 
     def process_cad_files(self):
         """Process all CAD files in the input directory"""
-        # Find DXF files
-        dxf_files = list(self.input_dir.glob('*.dxf'))
-        dwg_files = list(self.input_dir.glob('*.dwg'))
+        # Find DXF and DWG files in a single directory pass
+        dxf_files, dwg_files = [], []
+        with os.scandir(self.input_dir) as entries:
+            for entry in entries:
+                if not entry.is_file():
+                    continue
+                suffix = os.path.splitext(entry.name)[1].lower()
+                if suffix == '.dxf':
+                    dxf_files.append(Path(entry.path))
+                elif suffix == '.dwg':
+                    dwg_files.append(Path(entry.path))
         
         logger.info(f"Found {len(dxf_files)} DXF files and {len(dwg_files)} DWG files")
         
+        # One converter process for all DWGs; any it misses fall back to per-file conversion in the workers
+        converted_dwgs = self.convert_all_dwg_to_dxf(dwg_files) if dwg_files else {}
+        
+        tasks = [(dxf_file, 'dxf', None) for dxf_file in dxf_files] + \
+                [(dwg_file, 'dwg', converted_dwgs.get(dwg_file.stem)) for dwg_file in dwg_files]
         processed_images = []
         
-        # Process DXF files directly
-        for dxf_file in tqdm(dxf_files, desc="Processing DXF files"):
-            img_path = self.convert_dxf_to_image(dxf_file, 'dxf')
-            if img_path:
-                processed_images.append(img_path)
-        
-        # Convert DWG to DXF then to image
-        for dwg_file in tqdm(dwg_files, desc="Processing DWG files"):
-            dxf_path = self.convert_dwg_to_dxf(dwg_file)
-            if dxf_path:
-                img_path = self.convert_dxf_to_image(dxf_path, 'dwg')
-                if img_path:
-                    processed_images.append(img_path)
-                # Clean up temporary DXF
-                dxf_path.unlink(missing_ok=True)
+        # Each drawing renders and post-processes independently, so spread them over all cores
+        if tasks:
+            cpu_count = os.cpu_count() or 1
+            workers = min(cpu_count, len(tasks))
+            with ProcessPoolExecutor(max_workers=workers,
+                                     initializer=FormatConverter._init_worker,
+                                     initargs=(str(self.input_dir), str(self.output_dir),
+                                               self.backend, self.denoise, self.save_intermediate,
+                                               max(1, cpu_count // workers))) as executor:
+                results = list(tqdm(executor.map(FormatConverter._convert_one, tasks),
+                                    total=len(tasks), desc="Processing CAD files"))
+            processed_images = [img_path for img_path in results if img_path]
         
         # Prepare training dataset
         self.prepare_training_dataset(processed_images)
         
         logger.info(f"CAD file processing completed! Processed {len(processed_images)} images")
 
+    def place_dataset_image(self, src, dest):
+        """Put src at dest as a hardlink, symlink or copy according to link_mode"""
+        # Replace whatever a previous run left behind, possibly a link to src itself
+        try:
+            os.unlink(dest)
+        except FileNotFoundError:
+            pass
+        if self.link_mode == 'symlink':
+            os.symlink(Path(src).resolve(), dest)
+            return
+        if self.link_mode == 'hardlink':
+            try:
+                os.link(src, dest)
+                return
+            except OSError:
+                pass  # different filesystem or no hardlink support; fall back to a copy
+        shutil.copy2(src, dest)
+
     def prepare_training_dataset(self, processed_images, train_split=0.8):
         """Prepare dataset for YOLO training"""
         if not processed_images:
@@ -354,33 +665,22 @@ class FormatConverter:
         
         logger.info("Preparing training dataset...")
         
-        # Split into train and validation
-        np.random.shuffle(processed_images)
-        split_idx = int(len(processed_images) * train_split)
-        
-        train_images = processed_images[:split_idx]
-        val_images = processed_images[split_idx:]
-        
-        # Copy to dataset directories
-        for img_path in train_images:
+        # Split by a hash of the file name: no shuffle, and a drawing keeps its side across runs
+        split_counts = {'train': 0, 'val': 0}
+        for img_path in processed_images:
             img_path = Path(img_path)
-            dest_path = self.output_dir / 'dataset/train/images' / img_path.name
-            shutil.copy2(img_path, dest_path)
+            split = 'train' if zlib.crc32(img_path.name.encode()) % 10000 < train_split * 10000 else 'val'
             
-            # Create empty label file
-            label_path = self.output_dir / 'dataset/train/labels' / f'{img_path.stem}.txt'
-            label_path.touch()
-        
-        for img_path in val_images:
-            img_path = Path(img_path)
-            dest_path = self.output_dir / 'dataset/val/images' / img_path.name
-            shutil.copy2(img_path, dest_path)
+            # Link (or copy) into dataset directories
+            dest_path = self.output_dir / f'dataset/{split}/images' / img_path.name
+            self.place_dataset_image(img_path, dest_path)
             
             # Create empty label file
-            label_path = self.output_dir / 'dataset/val/labels' / f'{img_path.stem}.txt'
+            label_path = self.output_dir / f'dataset/{split}/labels' / f'{img_path.stem}.txt'
             label_path.touch()
+            split_counts[split] += 1
         
-        logger.info(f"Dataset prepared: {len(train_images)} training, {len(val_images)} validation images")
+        logger.info(f"Dataset prepared: {split_counts['train']} training, {split_counts['val']} validation images")
 
 def main():
     parser = argparse.ArgumentParser(description='Convert CAD files and annotation formats')
@@ -390,10 +690,19 @@ def main():
                        help='Conversion type (default: cad)')
     parser.add_argument('--train-split', type=float, default=0.8,
                        help='Train/validation split ratio (default: 0.8)')
+    parser.add_argument('--backend', choices=['mupdf', 'matplotlib', 'qt'], default='mupdf',
+                       help='DXF rendering backend (default: mupdf)')
+    parser.add_argument('--link-mode', choices=['hardlink', 'symlink', 'copy'], default='hardlink',
+                       help='How processed images are placed in the dataset split (default: hardlink)')
+    parser.add_argument('--save-intermediate', action='store_true',
+                       help='Also save raw renders to images/dxf_converted and images/dwg_converted')
+    parser.add_argument('--denoise', choices=['bilateral', 'gaussian', 'median'], default='gaussian',
+                       help='Noise filter applied to rendered CAD images (default: gaussian)')
     
     args = parser.parse_args()
     
-    converter = FormatConverter(args.input_dir, args.output_dir)
+    converter = FormatConverter(args.input_dir, args.output_dir, args.backend, args.link_mode, args.denoise,
+                                args.save_intermediate)
     
     if args.format == 'cad':
         converter.process_cad_files()
@@ -204,6 +204,7 @@ setup(
         "python-dotenv>=1.0.0",
         "requests>=2.31.0",
         "tqdm>=4.66.1",
+        "orjson>=3.9.10",
         "pyyaml>=6.0.1",
         "click>=8.1.7",
         "watchdog>=3.0.0",
@@ -0,0 +1,40 @@
+#!/usr/bin/env python3
+"""
+Tests for keyword detection in the PDF data extractor
+"""
+
+import sys
+from pathlib import Path
+
+sys.path.insert(0, str(Path(__file__).resolve().parent.parent / 'data-prep'))
+
+import pytest
+
+from extract_from_pdf import PDFDataExtractor
+
+
+@pytest.fixture
+def extractor(tmp_path):
+    extractor = PDFDataExtractor(tmp_path / 'pdfs', tmp_path / 'out')
+    yield extractor
+    extractor.close()
+
+
+def test_positions_index_original_text_after_non_ascii(extractor):
+    """Symbols, ligatures and accents before a keyword must not shift its span"""
+    text = "Ω ± µ ° ﬁx … → main panel, İnterruptór 20 A"
+    components = extractor.detect_electrical_keywords({'combined_text': text})
+
+    assert [c['type'] for c in components] == ['panel', 'switch', 'amperage']
+    for component in components:
+        start, end = component['position']
+        assert text[start:end] == component['text']
+    assert components[0]['text'] == 'main panel'
+    assert components[1]['text'] == 'İnterruptór'
+
+
+def test_placeholder_breaks_words(extractor):
+    """Characters without an ASCII form act as word boundaries, not letters"""
+    components = extractor.detect_electrical_keywords({'combined_text': 'Ωswitch→'})
+
+    assert [(c['type'], c['text']) for c in components] == [('switch', 'switch')]